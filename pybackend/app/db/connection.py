@@ -1,14 +1,160 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+"""
+MongoDB client and collection handles.
+
+The client is created by `connect()` from the FastAPI lifespan hook (which also
+warms the pool up) and closed by `close()` on shutdown. Collection handles are
+importable at module level anyway: they resolve against the current client on
+use, creating it on first use outside the app (scripts, benchmarks).
+
+Read-heavy paths listed in MONGO_SECONDARY_READS may read from secondaries
+with bounded staleness, see `for_reads`.
+"""
+import asyncio
+import importlib.util
+import logging
 import os
+from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import SecondaryPreferred
+from app.utils.metrics import MongoCommandListener, MongoPoolListener
+
+logger = logging.getLogger(__name__)
 
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "splitwise_db")
 
-client = AsyncIOMotorClient(MONGO_URL)
-db = client[DB_NAME]
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 10))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000))
+# preference order; compressors whose library is not installed are skipped
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+# connections opened before the app starts serving (defaults to the pool minimum)
+MONGO_WARMUP_CONNECTIONS = int(os.getenv("MONGO_WARMUP_CONNECTIONS", MONGO_MIN_POOL_SIZE))
+# read paths allowed on secondaries: any of activity, groups, export
+MONGO_SECONDARY_READS = {name.strip() for name in os.getenv("MONGO_SECONDARY_READS", "").split(",") if name.strip()}
+# the server rejects values below 90
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", 90))
+
+_COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+pool_listener = MongoPoolListener()
+_client: Optional[AsyncIOMotorClient] = None
+
+
+def available_compressors(names: str) -> list:
+    return [name for name in (n.strip() for n in names.split(","))
+            if name in _COMPRESSOR_MODULES and importlib.util.find_spec(_COMPRESSOR_MODULES[name])]
+
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "event_listeners": [MongoCommandListener(), pool_listener],
+    }
+    compressors = available_compressors(MONGO_COMPRESSORS)
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
+
+
+def get_client() -> AsyncIOMotorClient:
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(MONGO_URL, **client_options())
+    return _client
+
+
+async def warm_up(client: AsyncIOMotorClient, connections: int = MONGO_WARMUP_CONNECTIONS):
+    """
+    Open `connections` pooled connections (concurrent pings each need their own),
+    plus one to a secondary when secondary reads are enabled, so the first
+    requests do not pay for TCP/TLS handshakes and authentication.
+    """
+    pings = [client.admin.command("ping") for _ in range(max(connections, 1))]
+    if MONGO_SECONDARY_READS:
+        pings.append(client.admin.command("ping", read_preference=SecondaryPreferred()))
+    results = await asyncio.gather(*pings, return_exceptions=True)
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        logger.warning("MongoDB warm-up: %d of %d pings failed: %s", len(failures), len(results), failures[0])
+
+
+async def connect() -> AsyncIOMotorClient:
+    client = get_client()
+    await warm_up(client)
+    return client
+
+
+def close():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+class _Collection:
+    """Module-level handle for a collection of the current client's database."""
+
+    def __init__(self, name: str, read_preference=None):
+        self._name = name
+        self._read_preference = read_preference
+        self._bound = None  # (client, Motor collection)
+
+    def _resolve(self):
+        client = get_client()
+        if self._bound is None or self._bound[0] is not client:
+            collection = client[DB_NAME].get_collection(self._name, read_preference=self._read_preference)
+            self._bound = (client, collection)
+        return self._bound[1]
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+
+class _Database:
+    def get_collection(self, name: str) -> _Collection:
+        return _Collection(name)
+
+    def __getitem__(self, name: str):
+        return get_client()[DB_NAME][name]
+
+    def __getattr__(self, attr):
+        return getattr(get_client()[DB_NAME], attr)
+
+
+def for_reads(collection: _Collection, path: str) -> _Collection:
+    """
+    `collection`, or a handle on it that prefers secondaries (at most
+    MONGO_MAX_STALENESS_SECONDS behind) when `path` is listed in
+    MONGO_SECONDARY_READS. Only for reads that tolerate lag: responses keyed by
+    group version keep reading the primary so a cached body always matches its version.
+    """
+    if path not in MONGO_SECONDARY_READS:
+        return collection
+    return _Collection(collection._name, SecondaryPreferred(max_staleness=MONGO_MAX_STALENESS_SECONDS))
+
+
+db = _Database()
 
 # Collections
 users = db.get_collection("users")
 groups = db.get_collection("groups")
 expenses = db.get_collection("expenses")
 settlements = db.get_collection("settlements")
+ledgers = db.get_collection("ledgers")
+activity = db.get_collection("activity")
+checkpoints = db.get_collection("checkpoints")
+group_events = db.get_collection("group_events")
+monthly_stats = db.get_collection("monthly_stats")
+migrations = db.get_collection("migrations")
+description_stats = db.get_collection("description_stats")
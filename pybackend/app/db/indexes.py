@@ -0,0 +1,138 @@
+"""
+Declarative index registry.
+
+INDEXES lists every index the app relies on, per collection; `ensure_indexes`
+is run from the FastAPI lifespan hook. QUERY_SHAPES records the filters/sorts
+issued by app/models and app/routers so `python -m app.scripts.explain` can
+check each one is served by an index (no COLLSCAN, no in-memory SORT).
+When adding a query, add its shape here too.
+"""
+import logging
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import ConnectionFailure, PyMongoError
+from bson import ObjectId
+from datetime import datetime
+from .connection import db
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("username", ASCENDING)], name="username", sparse=True),
+    ],
+    "groups": [
+        IndexModel([("members", ASCENDING)], name="members"),
+    ],
+    "expenses": [
+        # equality on groupId, then the (date, _id) keyset order used for paging
+        IndexModel([("groupId", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], name="group_date"),
+        # search: multikey on description words, still in keyset order per (group, word)
+        IndexModel([("groupId", ASCENDING), ("terms", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)],
+                   name="group_terms_date"),
+    ],
+    "activity": [
+        IndexModel([("userId", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], name="user_date"),
+        # makes fan-out idempotent (backfill re-runs, retried writes)
+        IndexModel([("userId", ASCENDING), ("expenseId", ASCENDING)], name="user_expense_unique", unique=True),
+    ],
+    "group_events": [
+        # only relayed live (EVENTS_BACKEND=mongo); an hour is plenty for change stream resumes
+        IndexModel([("createdAt", ASCENDING)], name="created_ttl", expireAfterSeconds=3600),
+    ],
+    "monthly_stats": [
+        # upsert key of the write path; also serves group stats by month range
+        IndexModel([("groupId", ASCENDING), ("month", ASCENDING), ("userId", ASCENDING)], name="group_month_user", unique=True),
+        IndexModel([("userId", ASCENDING), ("month", ASCENDING)], name="user_month"),
+    ],
+    "checkpoints": [
+        IndexModel([("groupId", ASCENDING), ("asOf", DESCENDING)], name="group_asof", unique=True),
+    ],
+    "description_stats": [
+        # upsert key of the write path; prefix regexes on key are index ranges
+        IndexModel([("groupId", ASCENDING), ("key", ASCENDING)], name="group_key", unique=True),
+        IndexModel([("groupId", ASCENDING), ("lastUsed", DESCENDING)], name="group_recent"),
+    ],
+}
+
+_SAMPLE_ID = ObjectId("000000000000000000000000")
+_SAMPLE_GID = str(_SAMPLE_ID)
+_SAMPLE_DATE = datetime(2000, 1, 1)
+_NEWEST_FIRST = [("date", DESCENDING), ("_id", DESCENDING)]
+# expenses match groupId in both storage shapes (see app/models/expense.py group_filter);
+# with a sort the two index ranges are merged (SORT_MERGE), not sorted in memory
+_EXPENSE_GROUP = {"groupId": {"$in": [_SAMPLE_GID, _SAMPLE_ID]}}
+
+# (name, collection, filter, sort)
+QUERY_SHAPES = [
+    ("users.by_id", "users", {"_id": _SAMPLE_ID}, None),
+    ("users.by_email", "users", {"email": "someone@example.com"}, None),
+    ("users.by_username", "users", {"username": "someone"}, None),
+    ("users.by_emails", "users", {"email": {"$in": ["someone@example.com"]}}, None),
+    ("users.loader", "users", {"$or": [{"_id": {"$in": [_SAMPLE_ID]}}, {"email": {"$in": ["someone@example.com"]}}]}, None),
+    ("groups.by_id", "groups", {"_id": _SAMPLE_ID}, None),
+    ("groups.by_member", "groups", {"members": _SAMPLE_GID}, None),
+    ("expenses.by_group", "expenses", _EXPENSE_GROUP, None),
+    ("expenses.page", "expenses", _EXPENSE_GROUP, _NEWEST_FIRST),
+    ("expenses.page_before", "expenses", {**_EXPENSE_GROUP, "$or": [
+        {"date": {"$lt": _SAMPLE_DATE}}, {"date": _SAMPLE_DATE, "_id": {"$lt": _SAMPLE_ID}},
+    ]}, _NEWEST_FIRST),
+    ("expenses.export", "expenses", _EXPENSE_GROUP, [("date", ASCENDING), ("_id", ASCENDING)]),
+    ("activity.timeline", "activity", {"userId": _SAMPLE_GID}, _NEWEST_FIRST),
+    ("activity.timeline_before", "activity", {"userId": _SAMPLE_GID, "$or": [
+        {"date": {"$lt": _SAMPLE_DATE}}, {"date": _SAMPLE_DATE, "_id": {"$lt": _SAMPLE_ID}},
+    ]}, _NEWEST_FIRST),
+    ("ledgers.by_group", "ledgers", {"_id": _SAMPLE_GID}, None),
+    ("ledgers.by_groups", "ledgers", {"_id": {"$in": [_SAMPLE_GID]}}, None),
+    ("monthly_stats.group", "monthly_stats", {"groupId": _SAMPLE_GID, "month": {"$gte": "2000-01", "$lte": "2000-12"}}, [("month", ASCENDING)]),
+    ("monthly_stats.user", "monthly_stats", {"userId": _SAMPLE_GID, "month": {"$gte": "2000-01", "$lte": "2000-12"}}, [("month", ASCENDING)]),
+    ("checkpoints.nearest", "checkpoints", {"groupId": _SAMPLE_GID, "asOf": {"$lte": _SAMPLE_DATE}}, [("asOf", DESCENDING)]),
+    ("expenses.replay", "expenses", {**_EXPENSE_GROUP, "date": {"$gt": _SAMPLE_DATE, "$lte": _SAMPLE_DATE}},
+     [("date", ASCENDING), ("_id", ASCENDING)]),
+    ("expenses.search", "expenses", {"$and": [_EXPENSE_GROUP, {"terms": {"$all": ["dinner", "friday"]}}]}, _NEWEST_FIRST),
+    ("expenses.search_dates", "expenses", {"$and": [
+        _EXPENSE_GROUP, {"terms": {"$all": ["dinner"]}}, {"date": {"$gte": _SAMPLE_DATE, "$lt": _SAMPLE_DATE}},
+        {"$or": [{"cents": {"$gte": 100}}, {"cents": {"$exists": False}, "amount": {"$gte": 1}}]},
+    ]}, _NEWEST_FIRST),
+    ("description_stats.suggest", "description_stats", {"groupId": _SAMPLE_GID, "key": {"$regex": "^din"}}, None),
+    ("description_stats.trim", "description_stats", {"groupId": _SAMPLE_GID}, [("lastUsed", DESCENDING)]),
+]
+
+
+async def ensure_indexes(database=db):
+    """
+    Create every registered index. Failures are logged, not raised, so the API
+    still starts; an unreachable database skips the remaining collections.
+    """
+    for name, models in INDEXES.items():
+        try:
+            created = await database[name].create_indexes(models)
+            logger.info("Indexes on %s: %s", name, ", ".join(created))
+        except ConnectionFailure:
+            logger.exception("Database unreachable, skipping index creation")
+            return
+        except PyMongoError:
+            logger.exception("Failed to create indexes on %s", name)
+
+
+def plan_stages(plan: dict):
+    """Yield every stage name in an explain() plan tree (classic and SBE layouts)."""
+    if not isinstance(plan, dict):
+        return
+    if "queryPlan" in plan:
+        plan = plan["queryPlan"]
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "outerStage", "innerStage"):
+        if key in plan:
+            yield from plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from plan_stages(child)
+
+
+async def explain_shape(collection: str, query: dict, sort=None, database=db) -> list:
+    cursor = database[collection].find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    explained = await cursor.explain()
+    return list(plan_stages(explained["queryPlanner"]["winningPlan"]))
@@ -1,9 +1,31 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import auth, groups, expenses, settlements, activity
+from fastapi.responses import PlainTextResponse
+from .routers import auth, groups, expenses, settlements, activity, dashboard, stats
+from .db import connection
+from .db.indexes import ensure_indexes
+from .utils import metrics
+from .utils.auth import token_cache
+from .models.user import user_cache
+from .utils.hash import pool_stats
+from .services import events
+from .services.simplify import debts_cache
 import os
 
-app = FastAPI(title="Splitwise-like API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connection.connect()
+    await ensure_indexes()
+    relay = events.start_relay()
+    yield
+    if relay:
+        relay.cancel()
+    connection.close()
+
+
+app = FastAPI(title="Splitwise-like API", lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",
@@ -18,11 +40,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+def _app_gauges():
+    for name, cache in (("token", token_cache), ("user", user_cache)):
+        stats = cache.stats()
+        yield "auth_cache_hits", "Auth cache hits.", {"cache": name}, stats["hits"]
+        yield "auth_cache_misses", "Auth cache misses.", {"cache": name}, stats["misses"]
+        yield "auth_cache_size", "Auth cache entries.", {"cache": name}, stats["size"]
+    stats = debts_cache.stats()
+    yield "debts_cache_hits", "Simplified debts served from the per-version cache.", {}, stats["hits"]
+    yield "debts_cache_misses", "Simplified debts solved.", {}, stats["misses"]
+    yield "password_hash_in_flight", "bcrypt calls running or queued.", {}, pool_stats()["inFlight"]
+    yield "group_event_subscribers", "Open group event streams.", {}, events.hub.stats()["subscribers"]
+
+
+metrics.register_gauges(_app_gauges)
+metrics.register_gauges(connection.pool_listener.gauges)
+
 app.include_router(auth.router, prefix="/api")
 app.include_router(groups.router, prefix="/api")
 app.include_router(expenses.router, prefix="/api")
 app.include_router(settlements.router, prefix="/api")
 app.include_router(activity.router, prefix="/api")
+app.include_router(dashboard.router, prefix="/api")
+app.include_router(stats.router, prefix="/api")
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 async def root():
@@ -0,0 +1,83 @@
+from typing import List, Optional, Tuple
+import logging
+import os
+import random
+from pymongo.errors import BulkWriteError
+from app.db.connection import activity, for_reads
+from app.utils.pagination import DEFAULT_PAGE_SIZE, NEWEST_FIRST, before_filter, split_page
+
+logger = logging.getLogger(__name__)
+
+# timelines tolerate replication lag (MONGO_SECONDARY_READS=activity)
+activity_reads = for_reads(activity, "activity")
+
+# Per-user activity timeline, written at expense time (fan-out on write).
+# Each user keeps ACTIVITY_CAP entries; older ones are trimmed. Trimming costs
+# a query and a delete, so a write trims a member's timeline only about once
+# per ACTIVITY_TRIM_EVERY entries added to it (sampled, nothing to keep track
+# of): timelines run over the cap by about that many entries between trims.
+ACTIVITY_CAP = int(os.getenv("ACTIVITY_CAP", 500))
+ACTIVITY_TRIM_EVERY = max(int(os.getenv("ACTIVITY_TRIM_EVERY", 50)), 1)
+
+DUPLICATE_KEY = 11000
+
+
+def timeline_entry(user_id: str, expense: dict) -> dict:
+    return {
+        "userId": user_id,
+        "groupId": expense["groupId"],
+        "expenseId": expense["_id"],
+        "type": expense["type"],
+        "description": expense.get("description", ""),
+        "amount": expense.get("amount"),
+        "date": expense["date"],
+    }
+
+
+async def fan_out(expenses: List[dict], member_ids: List[str]):
+    """
+    Write one timeline entry per (member, expense), trimming the members'
+    timelines when due (see ACTIVITY_TRIM_EVERY).
+    Re-running it for the same expenses is harmless: (userId, expenseId) is unique.
+    """
+    if len(expenses) > ACTIVITY_CAP:
+        # anything older would be trimmed straight away
+        expenses = sorted(expenses, key=lambda exp: (exp["date"], exp["_id"]), reverse=True)[:ACTIVITY_CAP]
+    entries = [timeline_entry(uid, exp) for exp in expenses for uid in member_ids]
+    if not entries:
+        return
+    try:
+        await activity.insert_many(entries, ordered=False)
+    except BulkWriteError as exc:
+        if any(err.get("code") != DUPLICATE_KEY for err in exc.details.get("writeErrors", [])):
+            raise
+    for uid in member_ids:
+        if _due_for_trim(len(expenses)):
+            await trim(uid, ACTIVITY_CAP)
+
+
+def _due_for_trim(added: int) -> bool:
+    return added >= ACTIVITY_TRIM_EVERY or random.random() < added / ACTIVITY_TRIM_EVERY
+
+
+async def trim(user_id: str, cap: int = ACTIVITY_CAP):
+    """Delete everything past the newest `cap` entries of a user's timeline."""
+    cursor = activity.find({"userId": user_id}, {"date": 1}).sort(NEWEST_FIRST).skip(cap).limit(1)
+    cutoff = await cursor.to_list(length=1)
+    if not cutoff:
+        return
+    date, oid = cutoff[0]["date"], cutoff[0]["_id"]
+    await activity.delete_many({
+        "userId": user_id,
+        "$or": [{"date": {"$lt": date}}, {"date": date, "_id": {"$lte": oid}}],
+    })
+
+
+async def list_for_user(user_id: str, limit: int = DEFAULT_PAGE_SIZE, before: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of a user's timeline, newest first.
+    Raises ValueError for a malformed `before` cursor.
+    """
+    query = {"userId": user_id, **before_filter(before)}
+    docs = await activity_reads.find(query).sort(NEWEST_FIRST).limit(limit + 1).to_list(length=None)
+    return split_page(docs, limit)
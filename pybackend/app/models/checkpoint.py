@@ -0,0 +1,132 @@
+"""
+Point-in-time balances.
+
+A checkpoint is a snapshot of a group's balances (integer cents) covering every
+expense dated at or before `asOf`; `lastExpenseId` is the last of those in
+(date, _id) order. Balances at any time T are the nearest checkpoint at or
+before T plus a replay of the expenses dated in (asOf, T].
+
+Live writes are dated by the server clock, so checkpoints are taken
+CHECKPOINT_LAG_SECONDS in the past to leave in-flight writes time to land.
+Imports can carry older dates; record_expenses drops the checkpoints they
+would invalidate.
+"""
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING
+from app.db.connection import checkpoints, expenses
+from app.models.expense import group_filter, storage_projection
+from app.models.ledger import expense_deltas
+
+CHECKPOINT_LAG_SECONDS = float(os.getenv("CHECKPOINT_LAG_SECONDS", 300))
+# compaction keeps every checkpoint this recent, and one per month before that
+CHECKPOINT_KEEP_DAYS = int(os.getenv("CHECKPOINT_KEEP_DAYS", 30))
+
+OLDEST_FIRST = [("date", ASCENDING), ("_id", ASCENDING)]
+REPLAY_PROJECTION = storage_projection("paidBy", "splits", "date")
+
+
+async def nearest(gid: str, at: datetime) -> Optional[dict]:
+    """The latest checkpoint of a group taken at or before `at`, if any."""
+    return await checkpoints.find_one({"groupId": gid, "asOf": {"$lte": at}}, sort=[("asOf", DESCENDING)])
+
+
+async def replay(gid: str, balances: Dict[str, int], after: Optional[datetime], until: datetime) -> Tuple[int, Optional[dict]]:
+    """
+    Add the deltas of the group's expenses dated in (after, until] to `balances`
+    in place. Returns (number of expenses replayed, last expense replayed).
+    """
+    date_range = {"$lte": until}
+    if after is not None:
+        date_range["$gt"] = after
+    count, last = 0, None
+    async for exp in expenses.find({**group_filter(gid), "date": date_range}, REPLAY_PROJECTION).sort(OLDEST_FIRST):
+        for uid, amt in expense_deltas(exp).items():
+            balances[uid] += amt
+        count, last = count + 1, exp
+    return count, last
+
+
+async def balances_at(gid: str, at: datetime) -> Dict[str, int]:
+    """Balances in cents as of `at` (naive UTC), replaying only what follows the nearest checkpoint."""
+    cp = await nearest(gid, at)
+    balances = defaultdict(int, cp["balances"] if cp else {})
+    await replay(gid, balances, cp["asOf"] if cp else None, at)
+    return {uid: amt for uid, amt in balances.items() if amt}
+
+
+async def create_checkpoint(gid: str, as_of: Optional[datetime] = None) -> Optional[dict]:
+    """
+    Write a checkpoint for `as_of` (default: now minus CHECKPOINT_LAG_SECONDS).
+    Returns the new document, or None when nothing was recorded since the
+    previous checkpoint.
+    """
+    if as_of is None:
+        as_of = datetime.utcnow() - timedelta(seconds=CHECKPOINT_LAG_SECONDS)
+    base = await nearest(gid, as_of)
+    if base and base["asOf"] == as_of:
+        return None
+    balances = defaultdict(int, base["balances"] if base else {})
+    count, last = await replay(gid, balances, base["asOf"] if base else None, as_of)
+    if count == 0:
+        return None
+    doc = {
+        "groupId": gid,
+        "asOf": as_of,
+        "lastExpenseId": last["_id"],
+        "expenseCount": (base["expenseCount"] if base else 0) + count,
+        "balances": {uid: amt for uid, amt in balances.items() if amt},
+        "createdAt": datetime.utcnow(),
+    }
+    await checkpoints.insert_one(doc)
+    return doc
+
+
+async def invalidate_from(gid: str, date: datetime) -> int:
+    """Drop the checkpoints an expense dated `date` would have been part of."""
+    res = await checkpoints.delete_many({"groupId": gid, "asOf": {"$gte": date}})
+    return res.deleted_count
+
+
+async def compact(gid: str, now: Optional[datetime] = None) -> int:
+    """
+    Keep every checkpoint from the last CHECKPOINT_KEEP_DAYS and, before that,
+    only the last one of each calendar month. Returns the number deleted.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=CHECKPOINT_KEEP_DAYS)
+    stale: List = []
+    seen_months = set()
+    cursor = checkpoints.find({"groupId": gid, "asOf": {"$lt": cutoff}}, {"asOf": 1}).sort("asOf", DESCENDING)
+    async for cp in cursor:
+        month = (cp["asOf"].year, cp["asOf"].month)
+        if month in seen_months:
+            stale.append(cp["_id"])
+        else:
+            seen_months.add(month)
+    if not stale:
+        return 0
+    res = await checkpoints.delete_many({"_id": {"$in": stale}})
+    return res.deleted_count
+
+
+async def verify(gid: str) -> List[str]:
+    """
+    Check every checkpoint of a group against a full replay up to its asOf.
+    Returns a description of each problem found; empty if all are consistent.
+    """
+    problems = []
+    balances = defaultdict(int)
+    previous, total = None, 0
+    async for cp in checkpoints.find({"groupId": gid}).sort("asOf", ASCENDING):
+        count, last = await replay(gid, balances, previous, cp["asOf"])
+        previous, total = cp["asOf"], total + count
+        expected = {uid: amt for uid, amt in balances.items() if amt}
+        if cp["balances"] != expected:
+            problems.append(f"{cp['asOf'].isoformat()}: balances differ from replay")
+        if last is not None and cp["lastExpenseId"] != last["_id"]:
+            problems.append(f"{cp['asOf'].isoformat()}: lastExpenseId {cp['lastExpenseId']} != {last['_id']}")
+        if cp["expenseCount"] != total:
+            problems.append(f"{cp['asOf'].isoformat()}: expenseCount {cp['expenseCount']} != {total}")
+    return problems
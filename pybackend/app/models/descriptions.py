@@ -0,0 +1,91 @@
+"""
+Per-group description frequency tables for autocomplete.
+
+One `description_stats` document per (groupId, key) where `key` is the
+normalized (lowercased, single-spaced) description: how often the group used
+it, the spelling it was last written with (`label`) and when. Recording an
+expense bumps its entry; a table holds at most DESCRIPTION_TABLE_SIZE entries,
+the least recently used are dropped. Suggestions read only that table, so they
+cost the same whatever the number of expenses. Settlements are not counted.
+"""
+import os
+import re
+from typing import List
+from pymongo import DESCENDING, UpdateOne
+from app.db.connection import description_stats, expenses
+from app.models.expense import EXPENSE_TYPE, group_filter
+from app.utils.pagination import NEWEST_FIRST
+
+DESCRIPTION_TABLE_SIZE = int(os.getenv("DESCRIPTION_TABLE_SIZE", 200))
+# expenses a rebuild counts, newest first
+DESCRIPTION_HISTORY = int(os.getenv("DESCRIPTION_HISTORY", 2000))
+SUGGESTION_LIMIT = 8
+
+
+def description_key(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def _counts(docs: List[dict]) -> dict:
+    """{(groupId, key): [count, label, last used]} of the expenses among `docs`."""
+    counts = {}
+    for doc in docs:
+        key = description_key(doc.get("description", ""))
+        if doc.get("type") != EXPENSE_TYPE or not key:
+            continue
+        label = " ".join(doc["description"].split())
+        entry = counts.setdefault((str(doc["groupId"]), key), [0, label, doc["date"]])
+        entry[0] += 1
+        if doc["date"] >= entry[2]:
+            entry[1], entry[2] = label, doc["date"]
+    return counts
+
+
+async def record_descriptions(docs: List[dict]):
+    """Count the descriptions of newly recorded expenses, one bulk write per batch."""
+    keys, ops = [], []
+    for (gid, key), (count, label, used) in _counts(docs).items():
+        keys.append(gid)
+        ops.append(UpdateOne({"groupId": gid, "key": key},
+                             {"$inc": {"count": count}, "$max": {"lastUsed": used}, "$set": {"label": label}},
+                             upsert=True))
+    if not ops:
+        return
+    res = await description_stats.bulk_write(ops, ordered=False)
+    # only new entries can push a table over its size
+    for gid in {keys[i] for i in res.upserted_ids}:
+        await trim(gid)
+
+
+async def trim(gid: str, size: int = DESCRIPTION_TABLE_SIZE):
+    cursor = description_stats.find({"groupId": gid}, {"_id": 1}).sort("lastUsed", DESCENDING).skip(size)
+    stale = [doc["_id"] async for doc in cursor]
+    if stale:
+        await description_stats.delete_many({"_id": {"$in": stale}})
+
+
+async def suggest(gid: str, prefix: str = "", limit: int = SUGGESTION_LIMIT) -> List[dict]:
+    """The group's most used descriptions starting with `prefix` (case-insensitive), most frequent first."""
+    query = {"groupId": gid}
+    key = description_key(prefix)
+    if key:
+        query["key"] = {"$regex": "^" + re.escape(key)}
+    # a table is small: rank in memory rather than index every ordering
+    rows = await description_stats.find(query, {"label": 1, "count": 1, "lastUsed": 1}).to_list(length=DESCRIPTION_TABLE_SIZE)
+    rows.sort(key=lambda row: (row["count"], row["lastUsed"]), reverse=True)
+    return [{"description": row["label"], "count": row["count"]} for row in rows[:limit]]
+
+
+async def rebuild_group(gid: str, history: int = DESCRIPTION_HISTORY) -> int:
+    """Recount a group's table from its newest `history` expenses. Returns the entries kept."""
+    cursor = expenses.find({**group_filter(gid), "type": EXPENSE_TYPE}, {"description": 1, "type": 1, "date": 1})
+    docs = [{**doc, "groupId": gid} async for doc in cursor.sort(NEWEST_FIRST).limit(history)]
+    counts = _counts(docs)
+    await description_stats.delete_many({"groupId": gid})
+    newest = sorted(counts.items(), key=lambda item: item[1][2], reverse=True)[:DESCRIPTION_TABLE_SIZE]
+    if newest:
+        await description_stats.insert_many([
+            {"groupId": g, "key": key, "count": count, "label": label, "lastUsed": used}
+            for (g, key), (count, label, used) in newest
+        ])
+    return len(newest)
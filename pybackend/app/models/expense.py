@@ -1,10 +1,288 @@
-from ..db.connection import expenses
+"""
+Expense documents.
+
+Expenses are stored in one of two shapes:
+    legacy  {groupId, paidBy, splits: [{userId, amount}]} as hex strings and float amounts
+    v2      {v: 2, groupId, paidBy, cents, splits: [{u, c}]} as ObjectIds and integer cents
+New writes use v2 (see `to_storage`); app/scripts/migrate_expenses.py converts
+legacy documents. Reads go through `group_filter` / `storage_projection`, and
+`normalize` turns either shape into the in-memory one (hex string ids, float
+amounts) the rest of the app works with.
+
+Display names are snapshotted at write time: `paidByName`, and per split
+`userName` (legacy) or `n` (v2). app/services/names.py keeps them current.
+Both shapes carry `terms`, the lowercased words of the description, for
+search (`search_by_group`).
+"""
+import re
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from ..db.connection import expenses
+from ..utils.pagination import DEFAULT_PAGE_SIZE, NEWEST_FIRST, before_filter, split_page
+
+# Stored on every expense document as "type"
+EXPENSE_TYPE = "expense"
+SETTLEMENT_TYPE = "settlement"
+
+STORAGE_VERSION = 2
+
+# v2 field names of the legacy fields whose name changed
+_V2_FIELDS = {"amount": "cents"}
+
+
+# words of a description indexed for search (multikey index entries per expense)
+MAX_TERMS = 16
+
+_WORD = re.compile(r"\w+")
+
+
+def to_cents(amount) -> int:
+    return int(round(float(amount) * 100))
+
+
+def description_terms(text: str) -> List[str]:
+    """Distinct lowercased words of a description, in order."""
+    return list(dict.fromkeys(_WORD.findall((text or "").lower())))[:MAX_TERMS]
+
+
+def storage_projection(*fields: str) -> dict:
+    """A projection of the given (in-memory) fields that works on both storage shapes."""
+    projection = {"v": 1}
+    for field in fields:
+        projection[field] = 1
+        if field in _V2_FIELDS:
+            projection[_V2_FIELDS[field]] = 1
+    return projection
+
+
+# Fields an expense listing renders
+SUMMARY_PROJECTION = storage_projection(
+    "groupId", "paidBy", "paidByName", "amount", "description", "splits", "type", "date")
+
+
+def _id_forms(value: str) -> list:
+    """A reference as either shape may store it: the hex string and, if valid, the ObjectId."""
+    try:
+        return [value, ObjectId(value)]
+    except (InvalidId, TypeError):
+        return [value]
+
+
+def group_filter(gid: str) -> dict:
+    """Matches a group's expenses whichever shape stores their groupId."""
+    forms = _id_forms(gid)
+    return {"groupId": {"$in": forms} if len(forms) > 1 else gid}
+
+
+def to_storage(doc: dict) -> dict:
+    """
+    The v2 document for an in-memory expense. Expenses referencing ids that are
+    not ObjectIds cannot be stored as v2 and are kept in the legacy shape.
+    """
+    try:
+        stored = {
+            "v": STORAGE_VERSION,
+            "groupId": ObjectId(doc["groupId"]),
+            "paidBy": ObjectId(doc["paidBy"]),
+            # plain ints: BSON int32, widened to int64 only when needed (Int64 decodes ~2x slower)
+            "cents": to_cents(doc["amount"]),
+            "description": doc.get("description", ""),
+            "terms": description_terms(doc.get("description", "")),
+            "splits": [_split_storage(s) for s in doc.get("splits", [])],
+            "date": doc["date"],
+        }
+    except (InvalidId, TypeError):
+        return {**doc, "terms": description_terms(doc.get("description", ""))}
+    for field in ("_id", "type", "paidByName"):
+        if field in doc:
+            stored[field] = doc[field]
+    return stored
+
+
+def _split_storage(split: dict) -> dict:
+    stored = {"u": ObjectId(split["userId"]), "c": to_cents(split["amount"])}
+    if split.get("userName") is not None:
+        stored["n"] = split["userName"]
+    return stored
+
+
+def _split_normalized(split: dict) -> dict:
+    out = {"userId": str(split["u"]), "amount": split["c"] / 100}
+    if "n" in split:
+        out["userName"] = split["n"]
+    return out
+
+
+def normalize(doc: dict) -> dict:
+    """An expense read in either shape (possibly projected) in the in-memory shape."""
+    if doc.get("v") != STORAGE_VERSION:
+        return doc
+    out = {key: value for key, value in doc.items() if key not in ("v", "cents", "splits", "terms")}
+    if "groupId" in out:
+        out["groupId"] = str(out["groupId"])
+    if "paidBy" in out:
+        out["paidBy"] = str(out["paidBy"])
+    if "cents" in doc:
+        out["amount"] = doc["cents"] / 100
+    if "splits" in doc:
+        out["splits"] = [_split_normalized(s) for s in doc["splits"]]
+    return out
+
+
+def split_cents(exp: dict) -> Iterator[Tuple[str, int]]:
+    """(userId, cents) of each split of an expense in any shape, without normalizing it (hot in replays)."""
+    if exp.get("v") == STORAGE_VERSION:
+        return ((str(s["u"]), s["c"]) for s in exp.get("splits", []))
+    return ((str(s["userId"]), to_cents(s["amount"])) for s in exp.get("splits", []))
+
+
+async def group_ids_with_expenses() -> List[str]:
+    """Ids of every group that has expenses, whichever shape stores them."""
+    return sorted({str(gid) for gid in await expenses.distinct("groupId")})
+
+
+class SplitRef(NamedTuple):
+    userId: str
+    amount: float
+    userName: Optional[str]  # write-time snapshot, None on expenses written before names were
+
+
+class ExpenseSummary(NamedTuple):
+    """An expense as listings show it, read with SUMMARY_PROJECTION and normalized."""
+    id: str
+    groupId: str
+    paidBy: str
+    paidByName: Optional[str]
+    amount: float
+    description: str
+    splits: List[SplitRef]
+    type: Optional[str]
+    date: Optional[datetime]
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "ExpenseSummary":
+        return cls(
+            str(doc["_id"]), doc["groupId"], doc["paidBy"], doc.get("paidByName"), doc["amount"], doc.get("description", ""),
+            [SplitRef(s["userId"], s["amount"], s.get("userName")) for s in doc.get("splits", [])],
+            doc.get("type"), doc.get("date"),
+        )
+
 
 async def create_expense(doc: dict):
-    res = await expenses.insert_one(doc)
+    """Store an in-memory expense in the v2 shape; `doc` gets the new _id."""
+    res = await expenses.insert_one(to_storage(doc))
+    doc["_id"] = res.inserted_id
     return res.inserted_id
 
-async def list_by_group(gid: str):
-    cursor = expenses.find({"groupId": gid}).sort("date", -1)
-    return [doc async for doc in cursor]
+async def create_expenses(docs: List[dict]) -> Tuple[List[dict], Dict[int, str]]:
+    """
+    Unordered bulk insert. Returns (inserted docs, {index in docs: error message})
+    so one bad document does not stop the rest of the batch.
+    """
+    if not docs:
+        return [], {}
+    failures = {}
+    stored = [to_storage(doc) for doc in docs]
+    try:
+        await expenses.insert_many(stored, ordered=False)
+    except BulkWriteError as exc:
+        for err in exc.details.get("writeErrors", []):
+            failures[err["index"]] = err.get("errmsg", "write failed")
+    for doc, row in zip(docs, stored):
+        doc["_id"] = row["_id"]
+    inserted = [doc for i, doc in enumerate(docs) if i not in failures]
+    return inserted, failures
+
+async def list_by_group(gid: str, limit: int = DEFAULT_PAGE_SIZE, before: Optional[str] = None) -> Tuple[List[ExpenseSummary], Optional[str]]:
+    """
+    One page of a group's expenses, newest first.
+    Returns (expenses, next_cursor); raises ValueError for a malformed `before` cursor.
+    """
+    query = {**group_filter(gid), **before_filter(before)}
+    cursor = expenses.find(query, SUMMARY_PROJECTION).sort(NEWEST_FIRST).limit(limit + 1)
+    docs, next_cursor = split_page([doc async for doc in cursor], limit)
+    return [ExpenseSummary.from_doc(normalize(doc)) for doc in docs], next_cursor
+
+
+def _amount_filter(low: Optional[float], high: Optional[float]) -> dict:
+    cents, amount = {}, {}
+    if low is not None:
+        cents["$gte"], amount["$gte"] = to_cents(low), low
+    if high is not None:
+        cents["$lte"], amount["$lte"] = to_cents(high), high
+    if not cents:
+        return {}
+    return {"$or": [{"cents": cents}, {"cents": {"$exists": False}, "amount": amount}]}
+
+
+async def search_by_group(
+    gid: str,
+    text: str = "",
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    before: Optional[str] = None,
+) -> Tuple[List[ExpenseSummary], Optional[str]]:
+    """
+    One page of a group's expenses whose description contains every word of
+    `text`, within the amount range and dated in [start, end), newest first.
+    The group_terms_date index serves the group and first word in (date, _id)
+    order; the other words, amounts and the cursor are checked on the matches.
+    Returns (expenses, next_cursor); raises ValueError for a malformed `before` cursor.
+    """
+    clauses = [group_filter(gid), _amount_filter(min_amount, max_amount), before_filter(before)]
+    terms = description_terms(text)
+    if terms:
+        clauses.append({"terms": {"$all": terms}})
+    dates = {}
+    if start is not None:
+        dates["$gte"] = start
+    if end is not None:
+        dates["$lt"] = end
+    if dates:
+        clauses.append({"date": dates})
+    query = {"$and": [clause for clause in clauses if clause]}
+    cursor = expenses.find(query, SUMMARY_PROJECTION).sort(NEWEST_FIRST).limit(limit + 1)
+    docs, next_cursor = split_page([doc async for doc in cursor], limit)
+    return [ExpenseSummary.from_doc(normalize(doc)) for doc in docs], next_cursor
+
+
+async def set_user_name(gid: str, uid: str, name: str) -> int:
+    """
+    Rewrite the name snapshots of `uid` in one group's expenses (both storage
+    shapes) where they differ from `name`. Returns how many documents the
+    updates modified (0 when nothing was stale).
+    """
+    forms = _id_forms(uid)
+    changed = 0
+    res = await expenses.update_many(
+        {**group_filter(gid), "paidBy": {"$in": forms}, "paidByName": {"$ne": name}},
+        {"$set": {"paidByName": name}})
+    changed += res.modified_count
+    # a user has at most one split per expense: `$` is the one $elemMatch found
+    for id_field, name_field in (("u", "n"), ("userId", "userName")):
+        res = await expenses.update_many(
+            {**group_filter(gid), "splits": {"$elemMatch": {id_field: {"$in": forms}, name_field: {"$ne": name}}}},
+            {"$set": {f"splits.$.{name_field}": name}})
+        changed += res.modified_count
+    return changed
+
+
+async def add_missing_terms(gid: str, batch_size: int = 1000) -> int:
+    """Set `terms` on a group's expenses written before search. Returns the number updated."""
+    query = {**group_filter(gid), "terms": {"$exists": False}}
+    updated = 0
+    while True:
+        batch = await expenses.find(query, {"description": 1}).limit(batch_size).to_list(length=None)
+        if not batch:
+            return updated
+        ops = [UpdateOne({"_id": doc["_id"]}, {"$set": {"terms": description_terms(doc.get("description", ""))}})
+               for doc in batch]
+        res = await expenses.bulk_write(ops, ordered=False)
+        updated += res.modified_count
@@ -1,13 +1,56 @@
-from typing import List, Optional
+from typing import Dict, List, NamedTuple, Optional
 from bson import ObjectId
-from app.db.connection import db  # <<-- important: import the shared db instance
-from app.models.user import find_by_id
+from pymongo import ReturnDocument
+from app.db.connection import db, for_reads  # <<-- important: import the shared db instance
+from app.models.user import UserLoader, UserRef
 
 groups = db.get_collection("groups")
+# the group listing tolerates replication lag (MONGO_SECONDARY_READS=groups)
+groups_listing = for_reads(groups, "groups")
 
 
+GROUP_HEADER_PROJECTION = {"name": 1, "members": 1, "createdBy": 1, "version": 1}
+
+
+class GroupHeader(NamedTuple):
+    """The group fields reads need, read with GROUP_HEADER_PROJECTION."""
+    id: str
+    name: str
+    members: List[str]
+    createdBy: Optional[str]
+    version: int
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "GroupHeader":
+        return cls(str(doc["_id"]), doc.get("name", ""), doc.get("members", []), doc.get("createdBy"), doc.get("version", 0))
+
+
+# Every group carries a monotonically increasing `version`, bumped by every
+# expense, settlement or membership write. It backs ETags and response caching.
+
 async def add_member(gid: str, user_id: str):
-    await groups.update_one({"_id": ObjectId(gid)}, {"$addToSet": {"members": user_id}})
+    await groups.update_one({"_id": ObjectId(gid)}, {"$addToSet": {"members": user_id}, "$inc": {"version": 1}})
+
+async def bump_version(gid: str) -> Optional[int]:
+    """Increment the group's version and return the new one (None if there is no such group)."""
+    try:
+        oid = ObjectId(gid)
+    except Exception:
+        return None
+    doc = await groups.find_one_and_update(
+        {"_id": oid}, {"$inc": {"version": 1}}, projection={"version": 1}, return_document=ReturnDocument.AFTER)
+    return doc["version"] if doc else None
+
+async def get_version(gid: str) -> Optional[int]:
+    """The group's current version (0 if never bumped), or None if there is no such group."""
+    try:
+        oid = ObjectId(gid)
+    except Exception:
+        return None
+    doc = await groups.find_one({"_id": oid}, {"version": 1})
+    if not doc:
+        return None
+    return doc.get("version", 0)
 
 async def create_group(doc: dict) -> ObjectId:
     """
@@ -15,57 +58,95 @@ async def create_group(doc: dict) -> ObjectId:
     doc example:
     {
         "name": "Friends",
-        "members": ["shubhamsc@gmail.com"]
+        "members": ["6650f1c2a8b4e3d2c1b0a987"]   # user id hex strings
     }
     """
+    doc.setdefault("version", 0)
     result = await groups.insert_one(doc)
     return result.inserted_id
 
 
-async def get_group(group_id: str) -> Optional[dict]:
+async def get_group_header(group_id: str) -> Optional[GroupHeader]:
     try:
         oid = ObjectId(group_id)
     except Exception:
         # if id is not a valid ObjectId, return None
         return None
-    doc = await groups.find_one({"_id": oid})
-    return doc
+    doc = await groups.find_one({"_id": oid}, GROUP_HEADER_PROJECTION)
+    return GroupHeader.from_doc(doc) if doc else None
 
 
 async def get_groups_for_member(member_id: str) -> List[dict]:
     """
     Return all groups where members contains member_id.
-    If you store members as ObjectId in DB, try both forms.
+    Members are always stored as user id hex strings (see app/scripts/migrate_members.py).
     """
-    # try as string first (if you store strings)
-    cursor = groups.find({"members": member_id})
-    res = []
-    async for doc in cursor:
-        res.append(doc)
-
-    # if no results, and member_id can be ObjectId, try that
-    if not res:
-        try:
-            oid = ObjectId(member_id)
-            cursor = groups.find({"members": oid})
-            async for doc in cursor:
-                res.append(doc)
-        except Exception:
-            pass
-
-    return res
-
-
-async def get_group_members(gid: str):
-    group = await get_group(gid)
+    return await groups.find({"members": member_id}).to_list(length=None)
+
+
+async def get_group_ids_for_member(member_id: str) -> List[str]:
+    return [str(doc["_id"]) async for doc in groups.find({"members": member_id}, {"_id": 1})]
+
+
+async def get_group_versions_for_member(member_id: str) -> Dict[str, int]:
+    """{group id: version} of every group containing member_id."""
+    return {str(doc["_id"]): doc.get("version", 0)
+            async for doc in groups.find({"members": member_id}, {"version": 1})}
+
+
+async def list_groups_with_totals(member_id: str) -> List[dict]:
+    """
+    All groups containing member_id, each with `totalExpenses` summed server-side
+    and `memberDocs` holding the members' {_id, name, email}. One round trip.
+    """
+    pipeline = [
+        {"$match": {"members": member_id}},
+        # expenses store groupId as an ObjectId (v2) or a hex string (legacy): join on both
+        {"$addFields": {"groupKeys": ["$_id", {"$toString": "$_id"}]}},
+        {"$lookup": {
+            "from": "expenses",
+            "localField": "groupKeys",
+            "foreignField": "groupId",
+            "pipeline": [
+                {"$group": {"_id": None, "total": {"$sum": {"$ifNull": [{"$divide": ["$cents", 100]}, "$amount"]}}}},
+            ],
+            "as": "expenseTotals",
+        }},
+        # members are id hex strings; convert so the join is an _id index lookup. Values that are
+        # not ids (e.g. legacy email members) are dropped rather than failing the whole listing.
+        {"$addFields": {"memberOids": {"$filter": {
+            "input": {"$map": {"input": "$members", "in": {"$convert": {"input": "$$this", "to": "objectId", "onError": None}}}},
+            "cond": {"$ne": ["$$this", None]},
+        }}}},
+        {"$lookup": {
+            "from": "users",
+            "localField": "memberOids",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"name": 1, "email": 1}}],
+            "as": "memberDocs",
+        }},
+        {"$addFields": {"totalExpenses": {"$ifNull": [{"$first": "$expenseTotals.total"}, 0]}}},
+        {"$project": {"expenseTotals": 0, "memberOids": 0, "groupKeys": 0}},
+    ]
+    return await groups_listing.aggregate(pipeline).to_list(length=None)
+
+
+async def get_member_ids(gid: str) -> List[str]:
+    """User id hex strings of a group's members."""
+    try:
+        oid = ObjectId(gid)
+    except Exception:
+        return []
+    group = await groups.find_one({"_id": oid}, {"members": 1})
+    return group.get("members", []) if group else []
+
+
+
+async def get_group_members(gid: str) -> List[UserRef]:
+    group = await get_group_header(gid)
     if not group:
         return []
-    member_ids = group.get('members', [])
-    members = []
-    for mid in member_ids:
-        user = await find_by_id(mid)
-        if user:
-            user['id'] = str(user['_id'])
-            user.pop('_id', None)
-            members.append(user)
-    return members
+    loader = UserLoader()
+    loader.want_ids(group.members)
+    await loader.load()
+    return [ref for ref in map(loader.by_id, group.members) if ref]
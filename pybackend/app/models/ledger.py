@@ -0,0 +1,102 @@
+from typing import Dict, List, Optional
+from collections import defaultdict
+from pymongo import ReturnDocument
+from app.db.connection import ledgers, expenses
+from app.models.expense import group_filter, split_cents, storage_projection
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Balances are kept in integer cents so repeated $inc never accumulates float drift.
+
+
+def expense_deltas(exp: dict) -> Dict[str, int]:
+    """
+    Net balance change (in cents) an expense document (in any storage shape) causes
+    for each user. The payer is credited every share that is not their own and each split
+    user is debited their share, so the deltas of one expense sum to zero.
+    """
+    deltas = defaultdict(int)
+    paid_by = str(exp['paidBy'])
+    for uid, amt in split_cents(exp):
+        if uid == paid_by:
+            # the payer's own share is neither owed to nor by anyone
+            continue
+        deltas[paid_by] += amt
+        deltas[uid] -= amt
+    return deltas
+
+
+async def apply_deltas(gid: str, deltas: Dict[str, int]) -> Optional[Dict[str, int]]:
+    """
+    Apply per-user deltas to a group's ledger in a single atomic update.
+    Returns the group's balances after the update, or None if nothing changed.
+    """
+    inc = {f"balances.{uid}": amt for uid, amt in deltas.items() if amt}
+    if not inc:
+        return None
+    doc = await ledgers.find_one_and_update({"_id": gid}, {"$inc": inc}, upsert=True, return_document=ReturnDocument.AFTER)
+    return doc.get("balances", {})
+
+
+async def apply_expense(exp: dict) -> Optional[Dict[str, int]]:
+    return await apply_deltas(str(exp['groupId']), expense_deltas(exp))
+
+
+async def apply_expenses(docs: List[dict]):
+    """Apply a batch of expenses with one ledger update per group."""
+    per_group = defaultdict(lambda: defaultdict(int))
+    for exp in docs:
+        group = per_group[str(exp['groupId'])]
+        for uid, amt in expense_deltas(exp).items():
+            group[uid] += amt
+    for gid, deltas in per_group.items():
+        await apply_deltas(gid, deltas)
+
+
+async def get_balances(gid: str) -> Dict[str, int]:
+    doc = await ledgers.find_one({"_id": gid})
+    if not doc:
+        return {}
+    return doc.get("balances", {})
+
+
+async def get_balances_many(gids: List[str]) -> Dict[str, Dict[str, int]]:
+    """Ledger balances of several groups in one query, keyed by group id."""
+    if not gids:
+        return {}
+    return {doc["_id"]: doc.get("balances", {}) async for doc in ledgers.find({"_id": {"$in": gids}})}
+
+
+def balances_out(balances: Dict[str, int]) -> List[dict]:
+    """Render a cents balance map in the API's [{userId, amount}] shape."""
+    return [{"userId": uid, "amount": cents / 100} for uid, cents in balances.items() if cents]
+
+
+async def compute_from_expenses(gid: str) -> Dict[str, int]:
+    """Replay every expense of a group. Only used to rebuild or verify a ledger."""
+    balances = defaultdict(int)
+    async for exp in expenses.find(group_filter(gid), storage_projection("paidBy", "splits")):
+        for uid, amt in expense_deltas(exp).items():
+            balances[uid] += amt
+    return {uid: amt for uid, amt in balances.items() if amt}
+
+
+async def rebuild_group(gid: str) -> Dict[str, int]:
+    balances = await compute_from_expenses(gid)
+    await ledgers.replace_one({"_id": gid}, {"_id": gid, "balances": balances}, upsert=True)
+    return balances
+
+
+async def verify_group(gid: str) -> Dict[str, tuple]:
+    """
+    Compare the stored ledger with a full replay.
+    Returns {userId: (stored, expected)} for every mismatching user; empty if consistent.
+    """
+    stored = {uid: amt for uid, amt in (await get_balances(gid)).items() if amt}
+    expected = await compute_from_expenses(gid)
+    mismatches = {}
+    for uid in set(stored) | set(expected):
+        if stored.get(uid, 0) != expected.get(uid, 0):
+            mismatches[uid] = (stored.get(uid, 0), expected.get(uid, 0))
+    return mismatches
@@ -0,0 +1,120 @@
+"""
+Monthly spend rollups.
+
+One `monthly_stats` document per (groupId, userId, month "YYYY-MM") holds
+integer-cent totals:
+    paid        expense amounts the user paid
+    owed        the user's share of expenses (their splits, own share included)
+    settledOut  settlements the user paid
+    settledIn   settlements the user received
+They are $inc'ed by the expense write path, so stats endpoints read
+O(months x members) documents; `rebuild_group` recomputes them from expenses.
+"""
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from pymongo import UpdateOne
+from app.db.connection import expenses, monthly_stats
+from app.models.expense import SETTLEMENT_TYPE, group_filter, to_cents
+
+FIELDS = ("paid", "owed", "settledOut", "settledIn")
+
+Key = Tuple[str, str, str]  # (groupId, userId, month)
+
+
+def month_of(exp: dict) -> str:
+    return exp["date"].strftime("%Y-%m")
+
+
+def expense_rollup(exp: dict) -> Dict[Key, Dict[str, int]]:
+    """The increments one expense or settlement adds to the monthly rollups."""
+    incs = defaultdict(lambda: defaultdict(int))
+    gid, month = str(exp["groupId"]), month_of(exp)
+    settlement = exp.get("type") == SETTLEMENT_TYPE
+    incs[(gid, str(exp["paidBy"]), month)]["settledOut" if settlement else "paid"] += to_cents(exp["amount"])
+    for split in exp.get("splits", []):
+        incs[(gid, str(split["userId"]), month)]["settledIn" if settlement else "owed"] += to_cents(split["amount"])
+    return incs
+
+
+async def apply_rollups(docs: List[dict]):
+    """Fold a batch of expenses into the rollups with one bulk write."""
+    merged = defaultdict(lambda: defaultdict(int))
+    for exp in docs:
+        for key, fields in expense_rollup(exp).items():
+            for field, cents in fields.items():
+                merged[key][field] += cents
+    ops = [
+        UpdateOne({"groupId": gid, "userId": uid, "month": month},
+                  {"$inc": {field: cents for field, cents in fields.items() if cents}}, upsert=True)
+        for (gid, uid, month), fields in merged.items() if any(fields.values())
+    ]
+    if ops:
+        await monthly_stats.bulk_write(ops, ordered=False)
+
+
+async def get_group_stats(gid: str, first: str, last: str) -> List[dict]:
+    query = {"groupId": gid, "month": {"$gte": first, "$lte": last}}
+    return await monthly_stats.find(query, {"_id": 0, "groupId": 0}).sort("month", 1).to_list(length=None)
+
+
+async def get_user_stats(uid: str, first: str, last: str) -> List[dict]:
+    query = {"userId": uid, "month": {"$gte": first, "$lte": last}}
+    return await monthly_stats.find(query, {"_id": 0, "userId": 0}).sort("month", 1).to_list(length=None)
+
+
+def _cents(v2_field: str, legacy_field: str) -> dict:
+    """Integer cents of a v2 or legacy amount; legacy amounts are rounded per document, like to_cents."""
+    return {"$ifNull": [v2_field, {"$toLong": {"$round": [{"$multiply": [legacy_field, 100]}, 0]}}]}
+
+
+def _rollup_pipeline(gid: str, user_expr, cents_expr: dict, unwind: Optional[str] = None) -> list:
+    pipeline = [{"$match": group_filter(gid)}]
+    if unwind:
+        pipeline.append({"$unwind": unwind})
+    pipeline.append({"$group": {
+        "_id": {
+            "userId": {"$toString": user_expr},
+            "month": {"$dateToString": {"format": "%Y-%m", "date": "$date"}},
+            "settlement": {"$eq": ["$type", SETTLEMENT_TYPE]},
+        },
+        "cents": {"$sum": cents_expr},
+    }})
+    return pipeline
+
+
+async def compute_from_expenses(gid: str) -> Dict[Key, Dict[str, int]]:
+    """Recompute a group's rollups with two $group aggregations over its expenses."""
+    totals = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+    passes = (
+        (_rollup_pipeline(gid, "$paidBy", _cents("$cents", "$amount")), "settledOut", "paid"),
+        (_rollup_pipeline(gid, {"$ifNull": ["$splits.u", "$splits.userId"]}, _cents("$splits.c", "$splits.amount"),
+                          unwind="$splits"), "settledIn", "owed"),
+    )
+    for pipeline, settlement_field, expense_field in passes:
+        async for row in expenses.aggregate(pipeline):
+            key = (gid, str(row["_id"]["userId"]), row["_id"]["month"])
+            totals[key][settlement_field if row["_id"]["settlement"] else expense_field] += row["cents"]
+    return totals
+
+
+async def rebuild_group(gid: str) -> int:
+    totals = await compute_from_expenses(gid)
+    await monthly_stats.delete_many({"groupId": gid})
+    docs = [{"groupId": g, "userId": u, "month": m, **fields} for (g, u, m), fields in totals.items()]
+    if docs:
+        await monthly_stats.insert_many(docs)
+    return len(docs)
+
+
+async def verify_group(gid: str) -> Dict[Key, tuple]:
+    """{(groupId, userId, month): (stored, expected)} for every rollup that disagrees with a recompute."""
+    expected = await compute_from_expenses(gid)
+    stored = {}
+    async for doc in monthly_stats.find({"groupId": gid}):
+        stored[(gid, doc["userId"], doc["month"])] = {field: doc.get(field, 0) for field in FIELDS}
+    empty = dict.fromkeys(FIELDS, 0)
+    return {
+        key: (stored.get(key, empty), expected.get(key, empty))
+        for key in set(stored) | set(expected)
+        if stored.get(key, empty) != expected.get(key, empty)
+    }
@@ -2,39 +2,84 @@
 # from bson import ObjectId
 
 # app/models/user.py
-from typing import Optional
+from typing import Dict, Iterable, NamedTuple, Optional
 from bson import ObjectId
 from app.db.connection import users
+from app.utils.cache import TTLCache
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
-async def find_user_by_identifier(identifier: str) -> Optional[dict]:
+# Only the fields listings need; never ship password hashes or group arrays around.
+USER_REF_PROJECTION = {"name": 1, "email": 1}
+# What login needs to check the password and answer with the user
+CREDENTIALS_PROJECTION = {"name": 1, "email": 1, "password": 1, "groups": 1}
+
+
+class UserRef(NamedTuple):
+    """A user as listings show it, read with USER_REF_PROJECTION."""
+    id: str
+    name: str
+    email: Optional[str]
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "UserRef":
+        return cls(str(doc["_id"]), doc.get("name", ""), doc.get("email"))
+
+# Slim user records for request authentication, keyed by user id hex.
+# Anything that changes a user document must call invalidate_user().
+AUTH_USER_PROJECTION = {"name": 1, "email": 1, "groups": 1}
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+
+def invalidate_user(uid):
+    user_cache.pop(str(uid))
+
+
+async def find_auth_user(uid: str) -> Optional[dict]:
+    """Cached, password-free user record used by get_current_user."""
+    uid = str(uid)
+    doc = user_cache.get(uid)
+    if doc is not None:
+        return doc
+    try:
+        oid = ObjectId(uid)
+    except Exception:
+        return None
+    doc = await users.find_one({"_id": oid}, AUTH_USER_PROJECTION)
+    if doc:
+        user_cache.set(uid, doc)
+    return doc
+
+async def find_user_by_identifier(identifier: str) -> Optional[UserRef]:
     """
     Accepts an email (contains @) or a user-id hex string (ObjectId hex).
-    Returns the user document or None.
+    Returns the user or None.
     """
     if not identifier:
         return None
 
     # pref: if looks like email -> search by email
     if "@" in identifier:
-        user = await users.find_one({"email": identifier})
+        user = await users.find_one({"email": identifier}, USER_REF_PROJECTION)
         if user:
-            return user
+            return UserRef.from_doc(user)
 
     # try as ObjectId
     try:
         oid = ObjectId(identifier)
-        user = await users.find_one({"_id": oid})
+        user = await users.find_one({"_id": oid}, USER_REF_PROJECTION)
         if user:
-            return user
+            return UserRef.from_doc(user)
     except Exception:
         pass
 
     # fallback: username
-    user = await users.find_one({"username": identifier})
-    return user
+    user = await users.find_one({"username": identifier}, USER_REF_PROJECTION)
+    return UserRef.from_doc(user) if user else None
 
 
 async def add_group_to_user_by_id(user_oid: ObjectId, group_id_to_store):
@@ -48,6 +93,7 @@ async def add_group_to_user_by_id(user_oid: ObjectId, group_id_to_store):
             {"_id": user_oid},
             {"$addToSet": {"groups": group_id_to_store}}
         )
+        invalidate_user(user_oid)
         return bool(res.matched_count)
     except Exception:
         logger.exception("Failed to add group to user %s", user_oid)
@@ -57,11 +103,112 @@ async def create_user(doc: dict):
     res = await users.insert_one(doc)
     return res.inserted_id
 
-async def find_by_email(email: str):
-    return await users.find_one({"email": email})
+async def rename_user(uid: str, name: str) -> bool:
+    """Set a user's name. Expenses keep a snapshot of it: see app/services/names.py."""
+    try:
+        oid = ObjectId(uid)
+    except Exception:
+        return False
+    res = await users.update_one({"_id": oid}, {"$set": {"name": name}})
+    invalidate_user(uid)
+    return bool(res.matched_count)
 
-async def find_by_id(uid: str):
-    return await users.find_one({"_id": ObjectId(uid)})
+async def email_exists(email: str) -> bool:
+    return await users.find_one({"email": email}, {"_id": 1}) is not None
+
+async def find_credentials(email: str) -> Optional[dict]:
+    """The user document login needs (including the password hash), or None."""
+    return await users.find_one({"email": email}, CREDENTIALS_PROJECTION)
+
+async def find_user_ref(uid: str) -> Optional[UserRef]:
+    try:
+        oid = ObjectId(uid)
+    except Exception:
+        return None
+    doc = await users.find_one({"_id": oid}, USER_REF_PROJECTION)
+    return UserRef.from_doc(doc) if doc else None
+
+async def add_group_to_users(uids: Iterable[str], group_id: str):
+    """Record membership of `group_id` (hex string) on every given user in one update."""
+    uids = [str(uid) for uid in uids]
+    await users.update_many({"_id": {"$in": [ObjectId(uid) for uid in uids]}}, {"$addToSet": {"groups": group_id}})
+    for uid in uids:
+        invalidate_user(uid)
 
 async def add_group_to_user(uid: str, group_id: str):
     await users.update_one({"_id": ObjectId(uid)}, {"$addToSet": {"groups": group_id}})
+    invalidate_user(uid)
+
+
+class UserLoader:
+    """
+    Request-scoped, DataLoader-style batcher for user lookups.
+
+    Callers first queue every id / email they will need with `want_ids` /
+    `want_emails`, then `await load()` resolves all pending keys with a single
+    `$in` query. Results are memoized for the life of the loader, so later
+    `by_id` / `by_email` calls are plain dict reads.
+    """
+
+    def __init__(self):
+        self._by_id: Dict[str, Optional[UserRef]] = {}
+        self._by_email: Dict[str, Optional[UserRef]] = {}
+        self._pending_ids = set()
+        self._pending_emails = set()
+
+    def want_ids(self, ids: Iterable[str]):
+        for uid in ids:
+            uid = str(uid)
+            if uid not in self._by_id:
+                self._pending_ids.add(uid)
+
+    def want_emails(self, emails: Iterable[str]):
+        for email in emails:
+            if email not in self._by_email:
+                self._pending_emails.add(email)
+
+    async def load(self):
+        oids = []
+        for uid in self._pending_ids:
+            try:
+                oids.append(ObjectId(uid))
+            except Exception:
+                # not an ObjectId: can never match, remember the miss
+                self._by_id[uid] = None
+        emails = list(self._pending_emails)
+        self._pending_ids.clear()
+        self._pending_emails.clear()
+
+        clauses = []
+        if oids:
+            clauses.append({"_id": {"$in": oids}})
+        if emails:
+            clauses.append({"email": {"$in": emails}})
+        if not clauses:
+            return
+        query = clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+        for oid in oids:
+            self._by_id.setdefault(str(oid), None)
+        for email in emails:
+            self._by_email.setdefault(email, None)
+        async for doc in users.find(query, USER_REF_PROJECTION):
+            ref = UserRef.from_doc(doc)
+            self._by_id[ref.id] = ref
+            if ref.email:
+                self._by_email[ref.email] = ref
+
+    def by_id(self, uid) -> Optional[UserRef]:
+        return self._by_id.get(str(uid))
+
+    def by_email(self, email: str) -> Optional[UserRef]:
+        return self._by_email.get(email)
+
+    def name_of(self, uid, default: str = "Unknown") -> str:
+        ref = self.by_id(uid)
+        return ref.name if ref else default
+
+
+def get_user_loader() -> UserLoader:
+    """FastAPI dependency: a fresh loader per request."""
+    return UserLoader()
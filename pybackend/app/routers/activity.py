@@ -1,36 +1,31 @@
-from fastapi import APIRouter, Depends
-from ..models.group import groups as groups_collection
-from ..models.expense import expenses as expenses_collection
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from ..models.activity import list_for_user
+from ..models.expense import SETTLEMENT_TYPE
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from .auth import get_current_user
 
 router = APIRouter(tags=['activity'])
 
 @router.get("/activity")
-async def get_recent_activity(user=Depends(get_current_user)):
-    user_email = user.email
-    
-    # Get all groups the user is a member of
-    user_groups = await groups_collection.find({"members": user_email}).to_list(length=None)
-    group_ids = [str(group['_id']) for group in user_groups]
-    
-    # Get all expenses for these groups
-    expenses = await expenses_collection.find({"groupId": {"$in": group_ids}}).sort("date", -1).to_list(length=50)
+async def get_recent_activity(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    user=Depends(get_current_user),
+):
+    # Single indexed range read over the user's own timeline
+    try:
+        entries, next_cursor = await list_for_user(user.id, limit=limit, before=before)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
     activities = []
-    for expense in expenses:
-        expense_id = str(expense['_id'])
-        # Determine activity type
-        description = expense.get('description', 'New expense')
-        if "Settlement from" in description:
-            activity_type = "settle"
-        else:
-            activity_type = "expense"
-            
+    for entry in entries:
         activities.append({
-            "id": expense_id,
-            "type": activity_type,
-            "description": description,
-            "time": expense['date'].strftime("%Y-%m-%d %H:%M:%S")
+            "id": str(entry['expenseId']),
+            "type": "settle" if entry['type'] == SETTLEMENT_TYPE else "expense",
+            "description": entry.get('description') or 'New expense',
+            "time": entry['date'].strftime("%Y-%m-%d %H:%M:%S")
         })
         
-    return activities
+    return {"items": activities, "nextCursor": next_cursor}
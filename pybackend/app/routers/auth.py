@@ -1,117 +1,10 @@
-# import os
-# from fastapi import APIRouter, HTTPException, Depends, Header, status, Cookie, Response
-# from fastapi.responses import JSONResponse
-# from ..schemas.user_schema import UserCreate, UserLogin, UserOut
-# from ..models.user import create_user, find_by_email, find_by_id
-# from ..utils.hash import hash_password, verify_password
-# from ..utils.auth import create_access_token, verify_token
-
-# router = APIRouter(tags=['auth'])
-
-# @router.post("/auth/register", status_code=status.HTTP_201_CREATED)
-# async def register(user: UserCreate):
-#     # check if email already exists
-#     exists = await find_by_email(user.email)
-#     if exists:
-#         # consistent error structure
-#         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
-
-#     # hash_password should return hashed password (never store plain text)
-#     hashed = hash_password(user.password)
-
-#     user_doc = {
-#         "name": user.name,
-#         "email": user.email,
-#         "password": hashed,
-#         "groups": []
-#     }
-#     try:
-#         uid = await create_user(user_doc)
-#     except Exception as exc:
-#         # log exc server-side (not sent to client), return safe error to client
-#         # logger.exception("Failed to create user")
-#         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create user")
-
-#     return {"id": str(uid), "message": "User created"}
-
-# @router.post("/auth/login", response_model=dict)
-# async def login(body: UserLogin, response: Response):
-#     db_user = await find_by_email(body.email)
-#     if not db_user or not verify_password(body.password, db_user["password"]):
-#         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
-
-#     token = create_access_token({"id": str(db_user["_id"]), "email": db_user["email"]})
-
-#     is_production = os.getenv("ENVIRONMENT") == "production"
-
-#     # Set HttpOnly cookie (browser will store it; JS cannot read it)
-#     # Adjust secure flag depending on environment
-#     response.set_cookie(
-#         key="access_token",
-#         value=token,
-#         httponly=True,
-#         secure=is_production,  # True in production (HTTPS), False in development (HTTP)
-#         path="/",              # Set cookie path to root to ensure it's sent on all requests
-#         # samesite="lax",
-#         max_age=60 * 60 * 24 * 7  # 7 days, adjust as needed
-#     )
-
-#     user_out = {"id": str(db_user["_id"]), "name": db_user["name"], "email": db_user["email"], "groups": db_user.get("groups", [])}
-
-#     return {"access_token": None, "token_type": "bearer", "user": user_out}
-#     # Note: set access_token to None in the JSON to avoid duplication; cookie holds token.
-
-# # Accept token from Authorization header OR cookie named access_token
-# async def get_current_user(authorization: str = Header(None), access_token: str = Cookie(None)) -> UserOut:
-#     token = None
-#     if authorization:
-#         parts = authorization.split()
-#         if len(parts) == 2 and parts[0].lower() == "bearer":
-#             token = parts[1]
-#     if not token and access_token:
-#         token = access_token
-
-#     if not token:
-#         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing credentials")
-
-#     payload = verify_token(token)
-#     if not payload:
-#         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-
-#     user = await find_by_id(payload.get("id"))
-#     if not user:
-#         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-
-#     return UserOut(
-#         id=str(user["_id"]),
-#         name=user["name"],
-#         email=user["email"],
-#         groups=user.get("groups", [])
-#     )
-
-# @router.get("/auth/me", response_model=UserOut)
-# async def me(current_user = Depends(get_current_user)):
-#     return current_user
-
-# @router.post("/auth/logout")
-# async def logout(response: Response):
-#     is_production = os.getenv("ENVIRONMENT") == "production"
-#     response.delete_cookie(
-#         "access_token",
-#         path="/",
-#         httponly=True,
-#         secure=is_production,
-#         samesite="lax",
-#         domain=None
-#     )
-#     return JSONResponse({"message": "Logged out"})
-
 import os
-from fastapi import APIRouter, HTTPException, Depends, Header, status, Cookie, Request
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Header, status, Cookie, Request
 from fastapi.responses import JSONResponse
-from ..schemas.user_schema import UserCreate, UserLogin, UserOut
-from ..models.user import create_user, find_by_email, find_by_id
-from ..utils.hash import hash_password, verify_password
+from ..schemas.user_schema import UserCreate, UserLogin, UserOut, UserUpdate
+from ..models.user import create_user, email_exists, find_credentials, find_auth_user, rename_user
+from ..services.names import propagate_name
+from ..utils.hash import hash_password_async, verify_password_async, HashPoolSaturated
 from ..utils.auth import create_access_token, verify_token
 
 router = APIRouter(tags=['auth'])
@@ -126,14 +19,25 @@ COOKIE_PATH = "/"
 SAMESITE_PROD = "none"  # when using secure=True and cross-site
 SAMESITE_DEV = "lax"
 
+
+def _busy():
+    # password hashing pool is full: fail fast instead of queueing unboundedly
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server busy, please retry",
+        headers={"Retry-After": "1"},
+    )
+
 # ----- Register -----
 @router.post("/auth/register", status_code=status.HTTP_201_CREATED)
 async def register(user: UserCreate):
-    exists = await find_by_email(user.email)
-    if exists:
+    if await email_exists(user.email):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
-    hashed = hash_password(user.password)
+    try:
+        hashed = await hash_password_async(user.password)
+    except HashPoolSaturated:
+        raise _busy()
     user_doc = {
         "name": user.name,
         "email": user.email,
@@ -151,8 +55,14 @@ async def register(user: UserCreate):
 # ----- Login -----
 @router.post("/auth/login", response_model=dict)
 async def login(body: UserLogin):
-    db_user = await find_by_email(body.email)
-    if not db_user or not verify_password(body.password, db_user["password"]):
+    db_user = await find_credentials(body.email)
+    if not db_user:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
+    try:
+        valid = await verify_password_async(body.password, db_user["password"])
+    except HashPoolSaturated:
+        raise _busy()
+    if not valid:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
 
     token = create_access_token({"id": str(db_user["_id"]), "email": db_user["email"]})
@@ -203,7 +113,7 @@ async def get_current_user(authorization: str = Header(None), access_token: str
     if not payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    user = await find_by_id(payload.get("id"))
+    user = await find_auth_user(payload.get("id"))
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
@@ -220,6 +130,19 @@ async def me(current_user = Depends(get_current_user)):
     return current_user
 
 
+@router.patch("/auth/me", response_model=UserOut)
+async def update_me(body: UserUpdate, background: BackgroundTasks, current_user = Depends(get_current_user)):
+    """Rename the current user; their name is rewritten into past expenses after the response."""
+    name = body.name.strip()
+    if not name:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Name is required")
+    if name != current_user.name:
+        if not await rename_user(current_user.id, name):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        background.add_task(propagate_name, current_user.id)
+    return current_user.copy(update={"name": name})
+
+
 # ----- Logout -----
 @router.post("/auth/logout")
 async def logout(request: Request):
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from ..models.user import UserLoader, UserRef, get_user_loader
+from ..services.dashboard import positions_for_user
+from .auth import get_current_user
+
+router = APIRouter(tags=['dashboard'])
+
+@router.get("/dashboard")
+async def get_dashboard(user=Depends(get_current_user), loader: UserLoader = Depends(get_user_loader)):
+    """The current user's net balance with each counterparty over all their groups, largest first."""
+    positions = await positions_for_user(user.id)
+    loader.want_ids(positions)
+    await loader.load()
+
+    balances = []
+    for uid, cents in sorted(positions.items(), key=lambda item: -abs(item[1])):
+        other = loader.by_id(uid) or UserRef(uid, "Unknown", None)
+        balances.append({"user": other._asdict(), "amount": cents / 100})
+    return {"balances": balances}
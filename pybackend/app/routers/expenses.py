@@ -1,9 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from ..schemas.expense_schema import ExpenseCreate
-from ..models.expense import create_expense, list_by_group
-from ..models.user import find_by_id
+from ..models.expense import EXPENSE_TYPE, ExpenseSummary, list_by_group, search_by_group
+from ..models.descriptions import SUGGESTION_LIMIT, suggest
+from ..models.user import UserLoader, get_user_loader
+from ..services.expenses import record_expense
+from ..services.importer import FORMATS as IMPORT_FORMATS, import_expenses
+from ..services.exporter import FORMATS as EXPORT_FORMATS, export_group
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from ..utils.etag import version_etag, not_modified, not_modified_response, computed_response
+from ..models.group import get_version
 from .auth import get_current_user
-from datetime import datetime
+from datetime import datetime, timezone
 
 router = APIRouter(tags=['expenses'])
 
@@ -20,26 +29,158 @@ async def add_expense(body: ExpenseCreate, user=Depends(get_current_user)):
         "amount": body.amount,
         "description": body.description,
         "splits": [s.dict() for s in splits],
+        "type": EXPENSE_TYPE,
         "date": datetime.utcnow()
     }
-    eid = await create_expense(doc)
+    eid = await record_expense(doc)
     return {"expenseId": str(eid)}
 
+@router.post("/expenses/import")
+async def import_expenses_route(request: Request, format: Optional[str] = None, user=Depends(get_current_user)):
+    """
+    Bulk import from a streamed CSV or NDJSON body (see app/services/importer.py
+    for the row format). The format comes from `?format=` or the Content-Type.
+    Valid rows are inserted even when others fail; failures are reported per row.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(IMPORT_FORMATS)}")
+    return await import_expenses(request.stream(), format)
+
 @router.get("/expenses/group/{group_id}")
-async def list_expenses(group_id: str, user=Depends(get_current_user)):
-    items = await list_by_group(group_id)
+async def list_expenses(
+    group_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    user=Depends(get_current_user),
+    loader: UserLoader = Depends(get_user_loader),
+):
+    version = await get_version(group_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    variant = f"{limit}:{before or ''}"
+    etag = version_etag("expenses", group_id, version, variant)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    key = ("expenses", group_id, version, variant)
+    return await computed_response(key, etag, lambda: expenses_page(group_id, limit, before, loader))
+
+
+async def expenses_page(group_id: str, limit: int, before: Optional[str], loader: UserLoader) -> dict:
+    try:
+        items, next_cursor = await list_by_group(group_id, limit=limit, before=before)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": await render_items(items, loader), "nextCursor": next_cursor}
+
+
+async def render_items(items: List[ExpenseSummary], loader: UserLoader) -> List[dict]:
+    # Names are snapshotted at write time; only expenses written before that
+    # need a lookup, batched into one query (none at all on a migrated group)
+    for it in items:
+        if it.paidByName is None:
+            loader.want_ids([it.paidBy])
+        loader.want_ids(split.userId for split in it.splits if split.userName is None)
+    await loader.load()
+
     out = []
     for it in items:
-        it['id'] = str(it['_id'])
-        it.pop('_id', None)
-        # Populate paidByName
-        payer = await find_by_id(it['paidBy'])
-        it['paidByName'] = payer['name'] if payer else 'Unknown'
-        # Populate userName in splits
-        for split in it['splits']:
-            split_user = await find_by_id(split['userId'])
-            split['userName'] = split_user['name'] if split_user else 'Unknown'
-        # Set createdAt
-        it['createdAt'] = it['date'].isoformat() if 'date' in it and it['date'] else ''
-        out.append(it)
+        out.append({
+            "id": it.id,
+            "groupId": it.groupId,
+            "paidBy": it.paidBy,
+            "paidByName": it.paidByName if it.paidByName is not None else loader.name_of(it.paidBy),
+            "amount": it.amount,
+            "description": it.description,
+            "splits": [
+                {"userId": split.userId, "amount": split.amount,
+                 "userName": split.userName if split.userName is not None else loader.name_of(split.userId)}
+                for split in it.splits
+            ],
+            "type": it.type,
+            "date": it.date,
+            "createdAt": it.date.isoformat() if it.date else '',
+        })
     return out
+
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+@router.get("/expenses/group/{group_id}/search")
+async def search_expenses(
+    group_id: str,
+    request: Request,
+    q: str = "",
+    minAmount: Optional[float] = Query(None, ge=0),
+    maxAmount: Optional[float] = Query(None, ge=0),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    user=Depends(get_current_user),
+    loader: UserLoader = Depends(get_user_loader),
+):
+    """
+    Expenses whose description contains every word of `q`, optionally within an
+    amount range and dated in [from, to) (ISO 8601; naive times are UTC).
+    Paged newest first like the listing, in the listing's item shape.
+    """
+    if minAmount is not None and maxAmount is not None and minAmount > maxAmount:
+        raise HTTPException(status_code=400, detail="minAmount must not exceed maxAmount")
+    start, end = _utc_naive(start), _utc_naive(end)
+    version = await get_version(group_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    variant = ":".join(str(v) for v in (q, minAmount, maxAmount, start, end, limit, before))
+    etag = version_etag("search", group_id, version, variant)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+
+    async def compute():
+        try:
+            items, next_cursor = await search_by_group(group_id, q, minAmount, maxAmount, start, end, limit, before)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return {"items": await render_items(items, loader), "nextCursor": next_cursor}
+    return await computed_response(("search", group_id, version, variant), etag, compute)
+
+
+@router.get("/expenses/group/{group_id}/suggest")
+async def suggest_descriptions(
+    group_id: str,
+    request: Request,
+    prefix: str = "",
+    limit: int = Query(SUGGESTION_LIMIT, ge=1, le=50),
+    user=Depends(get_current_user),
+):
+    """Autocomplete for the add-expense dialog: the group's most used descriptions starting with `prefix`."""
+    version = await get_version(group_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    variant = f"{limit}:{prefix}"
+    etag = version_etag("suggest", group_id, version, variant)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    return await computed_response(("suggest", group_id, version, variant), etag,
+                                   lambda: suggest(group_id, prefix, limit))
+
+@router.get("/expenses/group/{group_id}/export")
+async def export_expenses(group_id: str, format: str = "ndjson", gzip: bool = False, user=Depends(get_current_user)):
+    """
+    Stream the group's full history, oldest first, as NDJSON or CSV. With gzip
+    the body is a .gz file (application/gzip), not a Content-Encoding clients
+    would decode on the fly.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    filename = f"group-{group_id}.{format}" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    media_type = "application/gzip" if gzip else EXPORT_FORMATS[format]
+    return StreamingResponse(export_group(group_id, format, gzip=gzip), media_type=media_type, headers=headers)
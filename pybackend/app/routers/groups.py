@@ -1,17 +1,20 @@
 from typing import List
 from asyncio.log import logger
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from ..schemas.group_schema import GroupCreate
-from ..models.group import create_group, get_group, groups
-from ..models.user import find_by_email
-from ..models.expense import list_by_group as list_expenses_by_group
+from ..models.group import create_group, get_group_header, get_version, list_groups_with_totals
+from ..models.user import UserLoader, UserRef, get_user_loader, add_group_to_users
+from ..models.ledger import get_balances as get_ledger_balances, balances_out
+from ..services.simplify import debts_out
+from ..services import events
+from ..utils.etag import version_etag, not_modified, not_modified_response, computed_response
 from .auth import get_current_user
-from collections import defaultdict
 
 router = APIRouter(tags=['groups'])
 
 @router.post("/groups")
-async def create_group_route(body: GroupCreate, user=Depends(get_current_user)):
+async def create_group_route(body: GroupCreate, user=Depends(get_current_user), loader: UserLoader = Depends(get_user_loader)):
     """
     Create a new group.
     Expected payload:
@@ -24,54 +27,49 @@ async def create_group_route(body: GroupCreate, user=Depends(get_current_user)):
     if not body.name:
         raise HTTPException(status_code=400, detail="Group name is required")
 
-    # Add current user to members list if not already there
-    user_email = user.email
-    if user_email not in body.members:
-        body.members.append(user_email)
+    # Members are sent as emails but stored as user ids: resolve them in one query
+    emails = [email for email in body.members if email != user.email]
+    loader.want_emails(emails)
+    await loader.load()
+    unknown = [email for email in emails if not loader.by_email(email)]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"No registered user for: {', '.join(unknown)}")
+
+    # Add current user to members list, without duplicates
+    member_ids = [user.id]
+    for email in emails:
+        uid = loader.by_email(email).id
+        if uid not in member_ids:
+            member_ids.append(uid)
 
     group_doc = {
         "name": body.name,
-        "members": body.members,
-        "createdBy": user_email
+        "members": member_ids,
+        "createdBy": user.id
     }
 
     group_id = await create_group(group_doc)
+    await add_group_to_users(member_ids, str(group_id))
 
     # Fetch the created group to return it with populated members
-    new_group = await get_group_route(str(group_id), user)
+    new_group = await build_group(str(group_id), loader)
 
     return new_group
 
 @router.get("/groups")
 async def get_all_groups_route(user=Depends(get_current_user)):
-    user_email = user.email
     group_list = []
-    
-    # Query for groups where the current user's email is in the 'members' array
-    query = {"members": user_email}
-    
-    async for group in groups.find(query):
+
+    # One aggregation: groups where the current user is in 'members',
+    # with expense totals and member details joined in server-side
+    for group in await list_groups_with_totals(user.id):
         group["id"] = str(group["_id"])
         del group["_id"]
 
-        # Calculate total expenses for the group
-        expenses = await list_expenses_by_group(group["id"])
-        total_expenses = sum(exp.get("amount", 0) for exp in expenses)
-        group["totalExpenses"] = total_expenses
-
-        # Populate member details
-        member_emails = group.get("members", [])
-        member_details = []
-        for email in member_emails:
-            user_data = await find_by_email(email)
-            if user_data:
-                member_details.append({
-                    "id": str(user_data.get("_id")),
-                    "email": user_data.get("email"),
-                    "name": user_data.get("name")
-                })
-        group["members"] = member_details
-        
+        # Populate member details, keeping the order of the members array
+        by_id = {ref.id: ref for ref in map(UserRef.from_doc, group.pop("memberDocs", []))}
+        group["members"] = [by_id[uid]._asdict() for uid in group.get("members", []) if uid in by_id]
+
         group_list.append(group)
 
     return group_list
@@ -79,84 +77,52 @@ async def get_all_groups_route(user=Depends(get_current_user)):
 
 
 @router.get("/groups/{group_id}")
-async def get_group_route(group_id: str, user=Depends(get_current_user)):
-    grp = await get_group(group_id)
-    if not grp:
+async def get_group_route(group_id: str, request: Request, user=Depends(get_current_user), loader: UserLoader = Depends(get_user_loader)):
+    # A single small version lookup decides between 304, a cached body and a recompute
+    version = await get_version(group_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    etag = version_etag("group", group_id, version)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    key = ("group", group_id, version)
+    return await computed_response(key, etag, lambda: build_group(group_id, loader))
+
+
+async def build_group(group_id: str, loader: UserLoader) -> dict:
+    """Group with populated members, ledger balances and simplified debts."""
+    group = await get_group_header(group_id)
+    if not group:
         raise HTTPException(status_code=404, detail="Group not found")
-    
-    grp['id'] = str(grp['_id'])
-    grp.pop('_id', None)
-
-    member_emails = grp.get("members", [])
-    member_details = []
-    for email in member_emails:
-        user_data = await find_by_email(email)
-        if user_data:
-            member_details.append({
-                "id": str(user_data.get("_id")),
-                "email": user_data.get("email"),
-                "name": user_data.get("name")
-            })
-
-    grp["members"] = member_details
-    
+
+    loader.want_ids(group.members)
+    await loader.load()
+    grp = {
+        "id": group.id,
+        "name": group.name,
+        "members": [ref._asdict() for ref in map(loader.by_id, group.members) if ref],
+        "createdBy": group.createdBy,
+        "version": group.version,
+    }
+
     # --- Balance and Debt Calculation ---
-    expenses = await list_expenses_by_group(group_id)
-    balances = defaultdict(float)
-
-    for exp in expenses:
-        paid_by = str(exp['paidBy'])
-        splits = exp.get('splits', [])
-        if splits:
-            for s in splits:
-                uid = str(s['userId'])
-                amt = float(s['amount'])
-                if uid == paid_by:
-                    # if paid_by is also part of split, their own share reduces net owed amount
-                    balances[paid_by] += (float(exp['amount']) - amt)
-                else:
-                    balances[paid_by] += amt
-                    balances[uid] -= amt
+    # Net balances come from the incrementally maintained ledger (O(members)).
+    ledger = await get_ledger_balances(group_id)
 
     # Create list of balances in the required format
-    grp['balances'] = [{"userId": uid, "amount": amt} for uid, amt in balances.items()]
+    grp['balances'] = balances_out(ledger)
 
     # Debt simplification
-    creditors = {uid: amt for uid, amt in balances.items() if amt > 0}
-    debtors = {uid: amt for uid, amt in balances.items() if amt < 0}
-    
-    debts = []
-    
-    creditor_uids = list(creditors.keys())
-    debtor_uids = list(debtors.keys())
-
-    i = 0
-    j = 0
-    while i < len(creditor_uids) and j < len(debtor_uids):
-        creditor_id = creditor_uids[i]
-        debtor_id = debtor_uids[j]
-        
-        credit = creditors[creditor_id]
-        debt = debtors[debtor_id]
-
-        amount_to_settle = min(credit, -debt)
-
-        if amount_to_settle > 0.01: # Avoid floating point inaccuracies
-            debts.append({
-                "from": debtor_id,
-                "to": creditor_id,
-                "amount": amount_to_settle
-            })
-
-            creditors[creditor_id] -= amount_to_settle
-            debtors[debtor_id] += amount_to_settle
-
-        if abs(creditors[creditor_id]) < 0.01:
-            i += 1
-        if abs(debtors[debtor_id]) < 0.01:
-            j += 1
-            
-    grp['debts'] = debts
+    grp['debts'] = debts_out(group_id, group.version, ledger)
     # --- End Calculation ---
 
     return grp
+
+
+@router.get("/groups/{group_id}/events")
+async def group_events_route(group_id: str, user=Depends(get_current_user)):
+    """Server-Sent Events stream of the group's expenses and balance changes (see app/services/events.py)."""
+    if await get_version(group_id) is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events.stream(group_id), media_type="text/event-stream", headers=headers)
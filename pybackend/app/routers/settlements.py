@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
-from ..models.expense import create_expense
-from ..models.user import find_by_id
+from ..models.expense import SETTLEMENT_TYPE
+from ..models.user import find_user_ref
+from ..models.ledger import get_balances, balances_out
+from ..models.checkpoint import balances_at
+from ..services.expenses import record_expense
+from ..models.group import get_version
+from ..utils.etag import version_etag, not_modified, not_modified_response, computed_response
 from .auth import get_current_user
-from ..db.connection import expenses
-from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Optional
 
 class SettlementCreate(BaseModel):
     groupId: str
@@ -20,42 +24,43 @@ async def create_settlement(body: SettlementCreate, user=Depends(get_current_use
     if body.amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be > 0")
     
-    payer = await find_by_id(body.payerId)
+    payer = await find_user_ref(body.payerId)
     if not payer:
         raise HTTPException(status_code=404, detail="Payer not found")
 
-    receiver = await find_by_id(body.receiverId)
+    receiver = await find_user_ref(body.receiverId)
     if not receiver:
         raise HTTPException(status_code=404, detail="Receiver not found")
 
     doc = {
         "groupId": body.groupId,
         "paidBy": body.payerId,
+        "paidByName": payer.name,
         "amount": body.amount,
-        "description": f"Settlement from {payer['name']} to {receiver['name']}",
-        "splits": [{"userId": body.receiverId, "amount": body.amount}],
+        "description": f"Settlement from {payer.name} to {receiver.name}",
+        "splits": [{"userId": body.receiverId, "amount": body.amount, "userName": receiver.name}],
+        "type": SETTLEMENT_TYPE,
         "date": datetime.utcnow()
     }
     
-    eid = await create_expense(doc)
+    eid = await record_expense(doc)
     return {"settlementId": str(eid)}
 
 @router.get('/settlements/group/{group_id}')
-async def compute_balances(group_id: str, user=Depends(get_current_user)):
-    cursor = expenses.find({'groupId': group_id})
-    balances = defaultdict(float)
-    async for exp in cursor:
-        paid_by = exp['paidBy']
-        splits = exp.get('splits', [])
-        if splits:
-            for s in splits:
-                uid = s['userId']
-                amt = float(s['amount'])
-                if uid == paid_by:
-                    # if paid_by is also part of split, their own share reduces net owed amount
-                    balances[paid_by] += (float(exp['amount']) - amt)
-                else:
-                    balances[paid_by] += amt
-                    balances[uid] -= amt
-    result = [{'userId': k, 'amount': v} for k, v in balances.items()]
-    return result
+async def compute_balances(group_id: str, request: Request, at: Optional[datetime] = None, user=Depends(get_current_user)):
+    """Current balances, or balances as of `at` (ISO 8601; naive times are UTC)."""
+    version = await get_version(group_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    if at is not None and at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    variant = at.isoformat() if at else ""
+    etag = version_etag("balances", group_id, version, variant)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    key = ("balances", group_id, version, variant)
+
+    async def compute():
+        balances = await balances_at(group_id, at) if at else await get_balances(group_id)
+        return balances_out(balances)
+    return await computed_response(key, etag, compute)
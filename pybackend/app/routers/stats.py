@@ -0,0 +1,91 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from ..models.group import get_version
+from ..models.stats import FIELDS, get_group_stats, get_user_stats
+from ..utils.etag import version_etag, not_modified, not_modified_response, computed_response
+from .auth import get_current_user
+
+router = APIRouter(tags=['stats'])
+
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+DEFAULT_MONTHS = 12
+MAX_MONTHS = 60
+
+
+def _shift(month: str, delta: int) -> str:
+    year, mon = map(int, month.split("-"))
+    index = year * 12 + (mon - 1) + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def month_range(first: Optional[str], last: Optional[str]) -> Tuple[str, str]:
+    """Inclusive "YYYY-MM" range, defaulting to the last DEFAULT_MONTHS months."""
+    last = last or datetime.utcnow().strftime("%Y-%m")
+    first = first or _shift(last, 1 - DEFAULT_MONTHS)
+    if first > last:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if first < _shift(last, 1 - MAX_MONTHS):
+        raise HTTPException(status_code=400, detail=f"At most {MAX_MONTHS} months per request")
+    return first, last
+
+
+def _amounts(doc: dict) -> dict:
+    return {field: doc.get(field, 0) / 100 for field in FIELDS}
+
+
+@router.get("/groups/{group_id}/stats")
+async def group_stats(
+    group_id: str,
+    request: Request,
+    first: Optional[str] = Query(None, alias="from", pattern=MONTH_PATTERN),
+    last: Optional[str] = Query(None, alias="to", pattern=MONTH_PATTERN),
+    user=Depends(get_current_user),
+):
+    """Per-month totals of the group, broken down by member (paid, owed, settled out / in)."""
+    first, last = month_range(first, last)
+    version = await get_version(group_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    variant = f"{first}:{last}"
+    etag = version_etag("stats", group_id, version, variant)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    key = ("stats", group_id, version, variant)
+    return await computed_response(key, etag, lambda: group_months(group_id, first, last))
+
+
+async def group_months(group_id: str, first: str, last: str) -> dict:
+    months = defaultdict(list)
+    for doc in await get_group_stats(group_id, first, last):
+        months[doc["month"]].append({"userId": doc["userId"], **_amounts(doc)})
+    out = []
+    for month, members in months.items():
+        out.append({
+            "month": month,
+            "total": sum(m["paid"] for m in members),
+            "members": members,
+        })
+    return {"from": first, "to": last, "months": out}
+
+
+@router.get("/stats/me")
+async def my_stats(
+    first: Optional[str] = Query(None, alias="from", pattern=MONTH_PATTERN),
+    last: Optional[str] = Query(None, alias="to", pattern=MONTH_PATTERN),
+    user=Depends(get_current_user),
+):
+    """The current user's per-month totals over all groups, with the per-group breakdown."""
+    first, last = month_range(first, last)
+    months = defaultdict(lambda: {"totals": dict.fromkeys(FIELDS, 0), "groups": []})
+    for doc in await get_user_stats(user.id, first, last):
+        month = months[doc["month"]]
+        for field in FIELDS:
+            month["totals"][field] += doc.get(field, 0)
+        month["groups"].append({"groupId": doc["groupId"], **_amounts(doc)})
+    out = [
+        {"month": month, **_amounts(data["totals"]), "groups": data["groups"]}
+        for month, data in months.items()
+    ]
+    return {"from": first, "to": last, "months": out}
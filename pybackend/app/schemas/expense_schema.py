@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Literal, Optional
+from datetime import datetime
 
 class SplitItem(BaseModel):
     userId: str
@@ -11,3 +12,8 @@ class ExpenseCreate(BaseModel):
     amount: float = Field(..., gt=0)
     description: str = ""
     splits: List[SplitItem] = []
+
+class ExpenseImportRow(ExpenseCreate):
+    # historical rows keep their original date and may be settlements
+    date: Optional[datetime] = None
+    type: Literal["expense", "settlement"] = "expense"
@@ -12,6 +12,9 @@ class UserOut(BaseModel):
     email: EmailStr
     groups: List[str] = []
 
+class UserUpdate(BaseModel):
+    name: str = Field(..., min_length=1, example="John Doe")
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
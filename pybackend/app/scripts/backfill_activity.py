@@ -0,0 +1,50 @@
+"""
+Populate activity timelines from existing expenses.
+
+Usage:
+    python -m app.scripts.backfill_activity [GROUP_ID ...]
+
+For every group (or only the given ones) the newest ACTIVITY_CAP expenses are
+fanned out to the group's members; nothing older could survive trimming anyway.
+Expenses written before `type` was stored get it set first, inferred from the
+"Settlement from" description prefix. Safe to re-run.
+"""
+import argparse
+import asyncio
+import sys
+from app.db.connection import expenses, groups
+from app.models.activity import ACTIVITY_CAP, fan_out
+from app.models.expense import EXPENSE_TYPE, SETTLEMENT_TYPE, group_filter, normalize
+from app.models.group import get_member_ids
+from app.utils.pagination import NEWEST_FIRST
+
+
+async def tag_legacy_types(gid: str):
+    untyped = {**group_filter(gid), "type": {"$exists": False}}
+    await expenses.update_many({**untyped, "description": {"$regex": "^Settlement from"}}, {"$set": {"type": SETTLEMENT_TYPE}})
+    await expenses.update_many(untyped, {"$set": {"type": EXPENSE_TYPE}})
+
+
+async def backfill_group(gid: str) -> int:
+    await tag_legacy_types(gid)
+    member_ids = await get_member_ids(gid)
+    cursor = expenses.find(group_filter(gid)).sort(NEWEST_FIRST).limit(ACTIVITY_CAP)
+    recent = [normalize(doc) async for doc in cursor]
+    await fan_out(recent, member_ids)
+    return len(recent)
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("group_ids", nargs="*")
+    args = parser.parse_args(argv)
+
+    gids = args.group_ids or [str(doc["_id"]) async for doc in groups.find({}, {"_id": 1})]
+    for gid in gids:
+        count = await backfill_group(gid)
+        print(f"{gid}: {count} expenses fanned out")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
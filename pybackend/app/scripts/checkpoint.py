@@ -0,0 +1,55 @@
+"""
+Create, compact or verify point-in-time balance checkpoints.
+
+Usage:
+    python -m app.scripts.checkpoint create [GROUP_ID ...]
+    python -m app.scripts.checkpoint compact [GROUP_ID ...]
+    python -m app.scripts.checkpoint verify [GROUP_ID ...]
+
+Without group ids every group that has expenses is processed. Run `create`
+periodically (e.g. hourly from cron) and `compact` daily; groups with nothing
+new since their last checkpoint are skipped. `verify` exits with status 1 if
+any checkpoint disagrees with a full replay.
+"""
+import argparse
+import asyncio
+import sys
+from app.models.expense import group_ids_with_expenses
+from app.models import checkpoint
+
+
+async def _group_ids(ids):
+    if ids:
+        return ids
+    return await group_ids_with_expenses()
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["create", "compact", "verify"])
+    parser.add_argument("group_ids", nargs="*")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for gid in await _group_ids(args.group_ids):
+        if args.command == "create":
+            doc = await checkpoint.create_checkpoint(gid)
+            if doc:
+                print(f"{gid}: checkpoint at {doc['asOf'].isoformat()} ({doc['expenseCount']} expenses)")
+            else:
+                print(f"{gid}: nothing new")
+        elif args.command == "compact":
+            print(f"{gid}: {await checkpoint.compact(gid)} checkpoints removed")
+        else:
+            problems = await checkpoint.verify(gid)
+            if problems:
+                failed += 1
+                for problem in problems:
+                    print(f"{gid}: {problem}")
+            else:
+                print(f"{gid}: ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,38 @@
+"""
+Verify that every registered query shape is index-backed.
+
+Usage:
+    python -m app.scripts.explain [--no-ensure]
+
+Runs explain() for each entry of app.db.indexes.QUERY_SHAPES and exits with
+status 1 if any winning plan contains a COLLSCAN or an in-memory SORT stage.
+Indexes are created first unless --no-ensure is given.
+"""
+import argparse
+import asyncio
+import sys
+from app.db.indexes import QUERY_SHAPES, ensure_indexes, explain_shape
+
+FORBIDDEN_STAGES = {"COLLSCAN", "SORT"}
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--no-ensure", action="store_true", help="do not create indexes before explaining")
+    args = parser.parse_args(argv)
+
+    if not args.no_ensure:
+        await ensure_indexes()
+
+    failed = 0
+    for name, collection, query, sort in QUERY_SHAPES:
+        stages = await explain_shape(collection, query, sort)
+        bad = FORBIDDEN_STAGES.intersection(stages)
+        status = "FAIL" if bad else "ok"
+        failed += bool(bad)
+        print(f"{status:4} {name}: {' <- '.join(stages)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
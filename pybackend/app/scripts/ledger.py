@@ -0,0 +1,47 @@
+"""
+Rebuild or verify the materialized per-group balance ledgers.
+
+Usage:
+    python -m app.scripts.ledger verify [GROUP_ID ...]
+    python -m app.scripts.ledger rebuild [GROUP_ID ...]
+
+Without group ids every group that has expenses is processed.
+`verify` exits with status 1 if any ledger disagrees with a full replay.
+"""
+import argparse
+import asyncio
+import sys
+from app.models.expense import group_ids_with_expenses
+from app.models.ledger import rebuild_group, verify_group
+
+
+async def _group_ids(ids):
+    if ids:
+        return ids
+    return await group_ids_with_expenses()
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("group_ids", nargs="*")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for gid in await _group_ids(args.group_ids):
+        if args.command == "rebuild":
+            balances = await rebuild_group(gid)
+            print(f"{gid}: rebuilt ({len(balances)} non-zero balances)")
+        else:
+            mismatches = await verify_group(gid)
+            if mismatches:
+                failed += 1
+                for uid, (stored, expected) in mismatches.items():
+                    print(f"{gid}: user {uid} stored={stored} expected={expected}")
+            else:
+                print(f"{gid}: ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,139 @@
+"""
+Convert legacy expense documents to the compact v2 storage shape.
+
+Usage:
+    python -m app.scripts.migrate_expenses [--batch-size 1000] [--pause-ms 0] [--restart] [--dry-run]
+
+Legacy documents (hex string ids, float amounts, {userId, amount} splits) are
+rewritten as v2 (ObjectId ids, integer cents, {u, c} splits, see
+app/models/expense.py) in _id order, one bulk write per batch. Readers accept
+both shapes, so the API keeps serving while this runs; --pause-ms spaces the
+batches out to limit the load it adds.
+
+The position is saved in `migrations` after every batch and an interrupted run
+resumes after the last converted _id (--restart starts over). Each replace is
+conditioned on the whole document as it was read, including the absence of
+the fields other writers add (`type` from backfill_activity, name snapshots
+from propagate_names / renames, `terms` from search_index), so a concurrent
+write is never overwritten: the changed documents are read again and
+converted as they are now, up to CONFLICT_RETRIES times; any still changing
+after that are reported and picked up by the next run. Documents whose ids are not
+ObjectIds cannot be stored as v2 and are left as they are.
+Safe to re-run.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from datetime import datetime
+from pymongo import ReplaceOne
+from app.db.connection import expenses, migrations
+from app.models.expense import STORAGE_VERSION, to_storage
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_ID = "expenses_v2"
+LEGACY = {"v": {"$ne": STORAGE_VERSION}}
+# fields concurrent writers may add to a legacy document
+GUARDED_FIELDS = ("type", "paidByName", "terms")
+CONFLICT_RETRIES = 3
+
+
+async def _saved_position():
+    doc = await migrations.find_one({"_id": MIGRATION_ID})
+    return doc.get("lastId") if doc else None
+
+
+async def _save_position(last_id, counts, completed=False):
+    update = {"lastId": last_id, "updatedAt": datetime.utcnow()}
+    if completed:
+        update["completedAt"] = update["updatedAt"]
+    change = {"$set": update}
+    if counts:
+        change["$inc"] = counts
+    await migrations.update_one({"_id": MIGRATION_ID}, change, upsert=True)
+
+
+def _replace(doc):
+    """The conditioned ReplaceOne converting `doc`, or None if it cannot be stored as v2."""
+    stored = to_storage(doc)
+    if stored.get("v") != STORAGE_VERSION:
+        return None
+    # matches only the document exactly as read (split names compare with `splits`)
+    expected = {**LEGACY, **{field: {"$exists": False} for field in GUARDED_FIELDS}, **doc}
+    return ReplaceOne(expected, stored)
+
+
+async def _migrate_batch(batch, dry_run):
+    """Returns (converted, changed concurrently, skipped)."""
+    ops = {}
+    for doc in batch:
+        op = _replace(doc)
+        if op is None:
+            logger.warning("expense %s: ids are not ObjectIds, left in the legacy shape", doc["_id"])
+        else:
+            ops[doc["_id"]] = op
+    skipped = len(batch) - len(ops)
+    if dry_run or not ops:
+        return len(ops), 0, skipped
+    converted = 0
+    for attempt in range(CONFLICT_RETRIES + 1):
+        res = await expenses.bulk_write(list(ops.values()), ordered=False)
+        converted += res.modified_count
+        if res.matched_count == len(ops):
+            return converted, 0, skipped
+        # documents written to since they were read: convert them as they are now
+        changed = await expenses.find({"_id": {"$in": list(ops)}, **LEGACY}).to_list(length=None)
+        ops = {doc["_id"]: _replace(doc) for doc in changed}
+        if not ops:
+            break
+    return converted, len(ops), skipped
+
+
+async def migrate(batch_size, pause, dry_run, restart):
+    last_id = None if restart else await _saved_position()
+    remaining = await expenses.count_documents({**LEGACY, **({"_id": {"$gt": last_id}} if last_id else {})})
+    logger.info("%d legacy expenses to convert%s", remaining, f" after {last_id}" if last_id else "")
+    totals = {"converted": 0, "conflicts": 0, "skipped": 0}
+    started = time.monotonic()
+    while True:
+        query = {**LEGACY, "_id": {"$gt": last_id}} if last_id else LEGACY
+        batch = await expenses.find(query).sort("_id", 1).limit(batch_size).to_list(length=None)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        counts = dict(zip(("converted", "conflicts", "skipped"), await _migrate_batch(batch, dry_run)))
+        for key, value in counts.items():
+            totals[key] += value
+        if not dry_run:
+            await _save_position(last_id, counts)
+        done = sum(totals.values())
+        rate = done / max(time.monotonic() - started, 1e-6)
+        logger.info("%d/%d expenses (%.0f%%), %.0f docs/s, ETA %.0fs", done, remaining,
+                    100 * done / max(remaining, 1), rate, max(remaining - done, 0) / max(rate, 1e-6))
+        if pause:
+            await asyncio.sleep(pause)
+    if not dry_run:
+        # a finished pass starts the next run from the beginning
+        await _save_position(None, {}, completed=True)
+    return totals
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause-ms", type=int, default=0, help="sleep between batches")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved position")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    totals = await migrate(args.batch_size, args.pause_ms / 1000, args.dry_run, args.restart)
+    print(f"expenses: {totals['converted']} converted, {totals['conflicts']} changed concurrently "
+          f"(re-run to pick them up), {totals['skipped']} left in the legacy shape")
+    return 1 if totals["conflicts"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,125 @@
+"""
+Rewrite group membership to the canonical user-id form.
+
+Usage:
+    python -m app.scripts.migrate_members [--batch-size 500] [--dry-run]
+
+Canonical form everywhere is the user's ObjectId as a hex string:
+groups.members, groups.createdBy, users.groups (group id hex strings) and
+expenses.paidBy / splits.userId (already stored that way).
+
+1. Groups whose members (or createdBy) still hold emails or raw ObjectIds are
+   rewritten in batches, resolving emails with one $in query per batch.
+   Each update is conditioned on the members array it was computed from, so a
+   concurrent membership change is never overwritten; such groups are
+   reported and picked up by the next run. Emails with no registered user are
+   dropped (they were never shown as members either).
+2. users.groups is rebuilt from group membership, one batch of users at a time.
+
+Safe to run while the API is serving traffic, and safe to re-run.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.db.connection import groups, users
+
+logger = logging.getLogger(__name__)
+
+LEGACY_GROUPS = {"$or": [
+    {"members": {"$regex": "@"}},
+    {"members": {"$type": "objectId"}},
+    {"createdBy": {"$regex": "@"}},
+]}
+
+
+def _canonical(value, by_email):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, str) and "@" in value:
+        return by_email.get(value)
+    return value
+
+
+async def _migrate_group_batch(batch, dry_run):
+    emails = {v for doc in batch for v in doc.get("members", []) + [doc.get("createdBy")]
+              if isinstance(v, str) and "@" in v}
+    by_email = {}
+    if emails:
+        async for u in users.find({"email": {"$in": list(emails)}}, {"email": 1}):
+            by_email[u["email"]] = str(u["_id"])
+
+    ops = []
+    for doc in batch:
+        members = []
+        for value in doc.get("members", []):
+            uid = _canonical(value, by_email)
+            if uid is None:
+                logger.warning("group %s: dropping unregistered member %s", doc["_id"], value)
+            elif uid not in members:
+                members.append(uid)
+        update = {"members": members}
+        if doc.get("createdBy") is not None:
+            update["createdBy"] = _canonical(doc["createdBy"], by_email) or doc["createdBy"]
+        ops.append(UpdateOne({"_id": doc["_id"], "members": doc.get("members", [])},
+                             {"$set": update, "$inc": {"version": 1}}))
+    if dry_run or not ops:
+        return len(ops), 0
+    res = await groups.bulk_write(ops, ordered=False)
+    return res.modified_count, len(ops) - res.matched_count
+
+
+async def migrate_groups(batch_size, dry_run):
+    migrated = conflicts = 0
+    batch = []
+    async for doc in groups.find(LEGACY_GROUPS, {"members": 1, "createdBy": 1}).batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            done, raced = await _migrate_group_batch(batch, dry_run)
+            migrated, conflicts = migrated + done, conflicts + raced
+            batch = []
+    if batch:
+        done, raced = await _migrate_group_batch(batch, dry_run)
+        migrated, conflicts = migrated + done, conflicts + raced
+    return migrated, conflicts
+
+
+async def rebuild_user_groups(batch_size, dry_run):
+    updated = 0
+    last_id = None
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id else {}
+        batch = await users.find(query, {"_id": 1}).sort("_id", 1).limit(batch_size).to_list(length=None)
+        if not batch:
+            return updated
+        last_id = batch[-1]["_id"]
+        ids = [str(u["_id"]) for u in batch]
+        memberships = {uid: [] for uid in ids}
+        async for g in groups.find({"members": {"$in": ids}}, {"members": 1}):
+            for uid in g["members"]:
+                if uid in memberships:
+                    memberships[uid].append(str(g["_id"]))
+        ops = [UpdateOne({"_id": ObjectId(uid)}, {"$set": {"groups": gids}}) for uid, gids in memberships.items()]
+        if not dry_run:
+            res = await users.bulk_write(ops, ordered=False)
+            updated += res.modified_count
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    migrated, conflicts = await migrate_groups(args.batch_size, args.dry_run)
+    print(f"groups: {migrated} rewritten, {conflicts} changed concurrently (re-run to pick them up)")
+    updated = await rebuild_user_groups(args.batch_size, args.dry_run)
+    print(f"users: {updated} group lists rewritten")
+    return 1 if conflicts else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,41 @@
+"""
+Bring the display names snapshotted into expenses in line with users' names.
+
+Usage:
+    python -m app.scripts.propagate_names [USER_ID ...]
+
+Without user ids every user is processed. Renames through the API propagate on
+their own (PATCH /api/auth/me); run this after renaming users directly in the
+database, to fill in names on expenses written before they were snapshotted,
+or to repair an expense written while its payer was being renamed.
+Safe to re-run: only stale snapshots are rewritten.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from app.db.connection import users
+from app.services.names import propagate_name
+
+
+async def _user_ids(ids):
+    if ids:
+        return ids
+    return [str(doc["_id"]) async for doc in users.find({}, {"_id": 1})]
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("user_ids", nargs="*")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    total = 0
+    for uid in await _user_ids(args.user_ids):
+        total += await propagate_name(uid)
+    print(f"expenses: {total} name snapshots rewritten")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,33 @@
+"""
+Prepare existing expenses for search and description autocomplete.
+
+Usage:
+    python -m app.scripts.search_index [GROUP_ID ...]
+
+Without group ids every group that has expenses is processed: expenses
+written before search get their description `terms`, and the group's
+autocomplete table is recounted from its newest DESCRIPTION_HISTORY expenses.
+New expenses maintain both on write. Safe to re-run.
+"""
+import argparse
+import asyncio
+import sys
+from app.models.descriptions import rebuild_group
+from app.models.expense import add_missing_terms, group_ids_with_expenses
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("group_ids", nargs="*")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    for gid in args.group_ids or await group_ids_with_expenses():
+        terms = await add_missing_terms(gid, args.batch_size)
+        entries = await rebuild_group(gid)
+        print(f"{gid}: {terms} expenses indexed, {entries} autocomplete entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
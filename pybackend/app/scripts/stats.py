@@ -0,0 +1,47 @@
+"""
+Rebuild or verify the monthly stats rollups.
+
+Usage:
+    python -m app.scripts.stats verify [GROUP_ID ...]
+    python -m app.scripts.stats rebuild [GROUP_ID ...]
+
+Without group ids every group that has expenses is processed.
+`verify` exits with status 1 if any rollup disagrees with a recompute.
+"""
+import argparse
+import asyncio
+import sys
+from app.models.expense import group_ids_with_expenses
+from app.models.stats import rebuild_group, verify_group
+
+
+async def _group_ids(ids):
+    if ids:
+        return ids
+    return await group_ids_with_expenses()
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("group_ids", nargs="*")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for gid in await _group_ids(args.group_ids):
+        if args.command == "rebuild":
+            count = await rebuild_group(gid)
+            print(f"{gid}: rebuilt ({count} rollups)")
+        else:
+            mismatches = await verify_group(gid)
+            if mismatches:
+                failed += 1
+                for (_, uid, month), (stored, expected) in sorted(mismatches.items()):
+                    print(f"{gid}: user {uid} {month} stored={stored} expected={expected}")
+            else:
+                print(f"{gid}: ok")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
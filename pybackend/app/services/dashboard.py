@@ -0,0 +1,41 @@
+"""
+A user's net position against every counterparty, across all their groups.
+
+Each group's debts are simplified from its ledger exactly as GET /api/groups/{id}
+shows them (and shared with it through the per-version cache of
+`simplify_group`, so a group is solved once per write, not once per request),
+then the user's side of those transfers is netted per counterparty. Three
+queries in total (group versions, ledgers, counterparty users), however many
+groups the user is in; nothing scans expenses.
+"""
+from collections import defaultdict
+from typing import Dict, Optional
+from app.models.group import get_group_versions_for_member
+from app.models.ledger import get_balances_many
+from app.services.simplify import simplify_group
+
+
+def net_positions(user_id: str, ledgers: Dict[str, Dict[str, int]], versions: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    {counterparty id: cents} from {group id: ledger balances}; positive when the
+    counterparty owes the user, negative when the user owes them. Zero positions
+    are left out. Groups with a known version reuse its cached debts.
+    """
+    versions = versions or {}
+    positions = defaultdict(int)
+    for gid, balances in ledgers.items():
+        if not balances.get(user_id):
+            # a settled-up user has no transfers in this group
+            continue
+        for debtor, creditor, cents in simplify_group(gid, versions.get(gid), balances):
+            if creditor == user_id:
+                positions[debtor] += cents
+            elif debtor == user_id:
+                positions[creditor] -= cents
+    return {uid: cents for uid, cents in positions.items() if cents}
+
+
+async def positions_for_user(user_id: str) -> Dict[str, int]:
+    versions = await get_group_versions_for_member(user_id)
+    ledgers = await get_balances_many(list(versions))
+    return net_positions(user_id, ledgers, versions)
@@ -0,0 +1,164 @@
+"""
+Live group updates over Server-Sent Events.
+
+Every recorded expense or settlement publishes a compact event for its group:
+the new expense plus the group's balances and simplified debts after it, so
+open clients apply it instead of re-fetching. Events carry the group version
+they produced; a client that sees a gap (or a `resync` event) re-fetches.
+
+EVENTS_BACKEND=local delivers to subscribers of this process only. With several
+workers use EVENTS_BACKEND=mongo: events are inserted into `group_events` and
+every worker relays them to its subscribers from a change stream (requires a
+replica set). `GET /api/groups/{id}/events` serves the stream.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+from pymongo.errors import PyMongoError
+from app.db.connection import group_events
+from app.models.group import get_version
+from app.models.ledger import balances_out
+from app.services.simplify import debts_out
+
+logger = logging.getLogger(__name__)
+
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "local")
+# events buffered per subscriber; a client further behind is told to resync
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", 100))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", 15))
+
+RESYNC = "resync"
+
+# (event name, group version, payload)
+Event = Tuple[str, Optional[int], dict]
+
+
+class GroupHub:
+    """In-process fan-out of events to the subscribers of each group."""
+
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    @contextmanager
+    def subscribe(self, gid: str):
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers[gid].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(gid)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[gid]
+
+    def deliver(self, gid: str, event: Event):
+        for queue in list(self._subscribers.get(gid, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # replaying a backlog this long costs more than one re-fetch
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait((RESYNC, event[1], {}))
+
+    def deliver_all(self, event: Event):
+        for gid in list(self._subscribers):
+            self.deliver(gid, event)
+
+    def stats(self) -> dict:
+        return {"groups": len(self._subscribers), "subscribers": sum(len(s) for s in self._subscribers.values())}
+
+
+hub = GroupHub()
+
+
+async def publish(gid: str, name: str, version: Optional[int], data: dict):
+    if EVENTS_BACKEND == "mongo":
+        await group_events.insert_one({
+            "groupId": gid, "event": name, "version": version, "data": data, "createdAt": datetime.utcnow(),
+        })
+    else:
+        hub.deliver(gid, (name, version, data))
+
+
+def expense_out(doc: dict) -> dict:
+    """An expense document in the listing's shape, minus the names (clients have the members)."""
+    return {
+        "id": str(doc["_id"]),
+        "groupId": doc["groupId"],
+        "paidBy": doc["paidBy"],
+        "amount": doc["amount"],
+        "description": doc.get("description", ""),
+        "splits": [{"userId": s["userId"], "amount": s["amount"]} for s in doc.get("splits", [])],
+        "type": doc.get("type"),
+        "createdAt": doc["date"].isoformat() if doc.get("date") else "",
+    }
+
+
+async def publish_expense(doc: dict, balances: Optional[Dict[str, int]], version: Optional[int]):
+    """Publish a recorded expense or settlement with the group's balances after it."""
+    data = {"expense": expense_out(doc)}
+    if balances is not None:
+        data["balances"] = balances_out(balances)
+        data["debts"] = debts_out(doc["groupId"], version, balances)
+    await publish(doc["groupId"], doc.get("type") or "expense", version, data)
+
+
+def _format(name: str, version: Optional[int], data: dict) -> str:
+    lines = [] if version is None else [f"id: {version}"]
+    lines.append(f"event: {name}")
+    lines.append("data: " + json.dumps({"version": version, **data}, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream(gid: str) -> AsyncIterator[str]:
+    """
+    SSE body for one subscriber. Opens with a `hello` carrying the version the
+    stream starts after, so the client can tell whether its copy is current;
+    comment lines keep idle connections (and proxies) alive.
+    """
+    with hub.subscribe(gid) as queue:
+        # read after subscribing: nothing newer than `version` can be missed
+        version = await get_version(gid)
+        yield "retry: 3000\n" + _format("hello", version, {})
+        while True:
+            try:
+                name, event_version, data = await asyncio.wait_for(queue.get(), EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if name != RESYNC and event_version is not None and version is not None and event_version <= version:
+                continue
+            yield _format(name, event_version, data)
+
+
+async def relay_change_stream():
+    """Relay events inserted by any worker to this worker's subscribers (EVENTS_BACKEND=mongo)."""
+    pipeline = [{"$match": {"operationType": "insert"}}]
+    resume_token = None
+    while True:
+        try:
+            async with group_events.watch(pipeline, resume_after=resume_token) as changes:
+                async for change in changes:
+                    resume_token = changes.resume_token
+                    doc = change["fullDocument"]
+                    hub.deliver(doc["groupId"], (doc["event"], doc.get("version"), doc.get("data", {})))
+        except PyMongoError:
+            logger.exception("group_events change stream failed; restarting")
+            # events may have been missed: every subscriber re-fetches
+            resume_token = None
+            hub.deliver_all((RESYNC, None, {}))
+            await asyncio.sleep(1)
+
+
+def start_relay() -> Optional[asyncio.Task]:
+    if EVENTS_BACKEND != "mongo":
+        return None
+    return asyncio.create_task(relay_change_stream())
@@ -0,0 +1,58 @@
+"""
+Write path shared by every endpoint that records an expense or settlement.
+
+The document gets its payer and split user names snapshotted (see
+app/services/names.py) and is inserted, followed by updating the data derived
+from it: the group's balance ledger, the monthly stats rollups, the
+description autocomplete table, the members' activity timelines and the group
+version. The change is then published to the group's live subscribers. Batch
+writes may carry historical dates, so they also drop balance checkpoints taken
+after the oldest of them.
+"""
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from app.models.expense import create_expense, create_expenses
+from app.models.ledger import apply_expense, apply_expenses
+from app.models.activity import fan_out
+from app.models.checkpoint import invalidate_from
+from app.models.stats import apply_rollups
+from app.models.descriptions import record_descriptions
+from app.models.group import bump_version, get_member_ids
+from app.services import events
+from app.services.names import snapshot_names
+
+
+async def record_expense(doc: dict):
+    """Insert `doc` (which must carry a `type`) and update derived data. Returns the new id."""
+    await snapshot_names([doc])
+    eid = await create_expense(doc)
+    balances = await apply_expense(doc)
+    await apply_rollups([doc])
+    await record_descriptions([doc])
+    await fan_out([doc], await get_member_ids(doc["groupId"]))
+    version = await bump_version(doc["groupId"])
+    await events.publish_expense(doc, balances, version)
+    return eid
+
+
+async def record_expenses(docs: List[dict]) -> Tuple[List[dict], Dict[int, str]]:
+    """
+    Batch variant of record_expense: one unordered insert_many, then derived data
+    updated once per group for the documents that were actually inserted.
+    Returns (inserted docs, {index in docs: error message}).
+    """
+    await snapshot_names(docs)
+    inserted, failures = await create_expenses(docs)
+    await apply_expenses(inserted)
+    await apply_rollups(inserted)
+    await record_descriptions(inserted)
+    by_group = defaultdict(list)
+    for doc in inserted:
+        by_group[doc["groupId"]].append(doc)
+    for gid, group_docs in by_group.items():
+        await fan_out(group_docs, await get_member_ids(gid))
+        await invalidate_from(gid, min(doc["date"] for doc in group_docs))
+        version = await bump_version(gid)
+        # too much to push as deltas: subscribers re-fetch
+        await events.publish(gid, events.RESYNC, version, {})
+    return inserted, failures
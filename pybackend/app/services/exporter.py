@@ -0,0 +1,102 @@
+"""
+Streaming export of a group's expenses as NDJSON or CSV.
+
+Expenses are read oldest first through a Motor cursor with a bounded
+batch_size and encoded one batch at a time; payer / split user names come
+from the snapshots stored on the expenses, and for expenses written before
+those, are resolved once per batch through a UserLoader. Nothing but the current batch is
+held in memory. The CSV columns are a superset of what the importer accepts,
+so an export can be re-imported as-is.
+"""
+import csv
+import io
+import json
+import os
+import zlib
+from typing import AsyncIterator, List
+from app.db.connection import expenses, for_reads
+from app.models.expense import group_filter, normalize
+from app.models.user import UserLoader
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+# exports tolerate replication lag (MONGO_SECONDARY_READS=export)
+export_reads = for_reads(expenses, "export")
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+CSV_COLUMNS = ["id", "groupId", "date", "type", "description", "amount", "paidBy", "paidByName", "splits", "splitNames"]
+
+
+async def _batches(gid: str, batch_size: int) -> AsyncIterator[List[dict]]:
+    cursor = export_reads.find(group_filter(gid)).sort([("date", 1), ("_id", 1)]).batch_size(batch_size)
+    batch = []
+    async for doc in cursor:
+        batch.append(normalize(doc))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _record(doc: dict, loader: UserLoader) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "groupId": doc["groupId"],
+        "date": doc["date"].isoformat() if doc.get("date") else "",
+        "type": doc.get("type", ""),
+        "description": doc.get("description", ""),
+        "amount": doc["amount"],
+        "paidBy": doc["paidBy"],
+        "paidByName": doc["paidByName"] if "paidByName" in doc else loader.name_of(doc["paidBy"]),
+        "splits": [
+            {"userId": s["userId"], "userName": s["userName"] if "userName" in s else loader.name_of(s["userId"]),
+             "amount": s["amount"]}
+            for s in doc.get("splits", [])
+        ],
+    }
+
+
+def _csv_row(record: dict) -> list:
+    splits = record["splits"]
+    return [
+        record["id"], record["groupId"], record["date"], record["type"], record["description"],
+        record["amount"], record["paidBy"], record["paidByName"],
+        ";".join(f"{s['userId']}:{s['amount']}" for s in splits),
+        ";".join(s["userName"] for s in splits),
+    ]
+
+
+def _encode_batch(records: List[dict], fmt: str) -> bytes:
+    if fmt == "ndjson":
+        return "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode()
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(_csv_row(r) for r in records)
+    return buf.getvalue().encode()
+
+
+async def export_group(gid: str, fmt: str, gzip: bool = False, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """Yield the encoded export of a group chunk by chunk (one chunk per cursor batch)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    compressor = zlib.compressobj(wbits=31) if gzip else None  # wbits=31: gzip container
+
+    def emit(data: bytes) -> bytes:
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else data
+
+    if fmt == "csv":
+        header = io.StringIO()
+        csv.writer(header, lineterminator="\n").writerow(CSV_COLUMNS)
+        yield emit(header.getvalue().encode())
+
+    loader = UserLoader()
+    async for batch in _batches(gid, batch_size):
+        for doc in batch:
+            if "paidByName" not in doc:
+                loader.want_ids([doc["paidBy"]])
+            loader.want_ids(s["userId"] for s in doc.get("splits", []) if "userName" not in s)
+        await loader.load()
+        yield emit(_encode_batch([_record(doc, loader) for doc in batch], fmt))
+
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,157 @@
+"""
+Streaming bulk import of expenses from CSV or NDJSON request bodies.
+
+The body is consumed chunk by chunk and split into lines, rows are validated
+against ExpenseImportRow and written IMPORT_BATCH_SIZE at a time through
+record_expenses, so memory stays bounded by the batch size no matter how
+large the upload is.
+
+NDJSON: one ExpenseImportRow JSON object per line.
+CSV: a header line followed by one row per line (quoted newlines are not
+supported). Columns: groupId, paidBy, amount, description, splits, and the
+optional date (ISO 8601) and type. `splits` is "userId:amount;userId:amount".
+"""
+import csv
+import json
+import os
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+from pydantic import ValidationError
+from app.schemas.expense_schema import ExpenseImportRow
+from app.services.expenses import record_expenses
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+IMPORT_MAX_LINE_BYTES = 64 * 1024
+# only the first errors are returned so a completely broken file cannot blow up the response
+IMPORT_MAX_ERRORS = 1000
+
+FORMATS = ("csv", "ndjson")
+
+
+class RowError(Exception):
+    pass
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """Yield (line number, text) for every non-empty line of a byte stream."""
+    buf = b""
+    lineno = 0
+    async for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for raw in lines:
+            lineno += 1
+            yield lineno, raw.decode("utf-8", errors="replace").rstrip("\r")
+        if len(buf) > IMPORT_MAX_LINE_BYTES:
+            raise RowError(f"line {lineno + 1} exceeds {IMPORT_MAX_LINE_BYTES} bytes")
+    if buf:
+        yield lineno + 1, buf.decode("utf-8", errors="replace").rstrip("\r")
+
+
+def parse_splits(value: str) -> List[dict]:
+    splits = []
+    for part in filter(None, (p.strip() for p in value.split(";"))):
+        uid, sep, amount = part.rpartition(":")
+        if not sep or not uid:
+            raise RowError(f"invalid split {part!r}, expected userId:amount")
+        splits.append({"userId": uid, "amount": amount})
+    return splits
+
+
+def parse_ndjson(line: str) -> dict:
+    try:
+        row = json.loads(line)
+    except ValueError as exc:
+        raise RowError(f"invalid JSON: {exc}")
+    if not isinstance(row, dict):
+        raise RowError("expected a JSON object")
+    return row
+
+
+def parse_csv(line: str, header: List[str]) -> dict:
+    values = next(csv.reader([line]))
+    if len(values) != len(header):
+        raise RowError(f"expected {len(header)} columns, got {len(values)}")
+    row = {k: v for k, v in zip(header, values) if v != ""}
+    if "splits" in row:
+        row["splits"] = parse_splits(row["splits"])
+    return row
+
+
+def to_doc(row: dict) -> dict:
+    try:
+        item = ExpenseImportRow(**row)
+    except ValidationError as exc:
+        raise RowError("; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()))
+    if not item.splits:
+        raise RowError("Provide splits list")
+    date = item.date or datetime.utcnow()
+    if date.tzinfo is not None:
+        # stored dates are naive UTC, like every server-assigned date
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return {
+        "groupId": item.groupId,
+        "paidBy": item.paidBy,
+        "amount": item.amount,
+        "description": item.description,
+        "splits": [s.dict() for s in item.splits],
+        "type": item.type,
+        "date": date,
+    }
+
+
+class ImportResult:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def error(self, row: int, message: str):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errorsTruncated": self.failed > len(self.errors),
+        }
+
+
+async def _flush(batch: List[Tuple[int, dict]], result: ImportResult):
+    inserted, failures = await record_expenses([doc for _, doc in batch])
+    result.inserted += len(inserted)
+    for idx, message in failures.items():
+        result.error(batch[idx][0], message)
+
+
+async def import_expenses(chunks: AsyncIterator[bytes], fmt: str, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """Import every row of the stream. Row numbers in errors are 1-based line numbers."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    result = ImportResult()
+    header: Optional[List[str]] = None
+    batch: List[Tuple[int, dict]] = []
+    try:
+        async for lineno, line in iter_lines(chunks):
+            if not line.strip():
+                continue
+            if fmt == "csv" and header is None:
+                header = [h.strip() for h in next(csv.reader([line]))]
+                continue
+            try:
+                row = parse_csv(line, header) if fmt == "csv" else parse_ndjson(line)
+                batch.append((lineno, to_doc(row)))
+            except RowError as exc:
+                result.error(lineno, str(exc))
+            if len(batch) >= batch_size:
+                await _flush(batch, result)
+                batch = []
+    except RowError as exc:
+        # unrecoverable stream problem: keep what was imported, report where it stopped
+        result.error(0, str(exc))
+    if batch:
+        await _flush(batch, result)
+    return result.as_dict()
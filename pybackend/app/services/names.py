@@ -0,0 +1,55 @@
+"""
+Display names snapshotted into expenses.
+
+Expenses carry their payer's and split users' names as of the write
+(`snapshot_names`), so listings and exports render them without user lookups.
+When a user is renamed, `propagate_name` rewrites the snapshots group by group
+with bulk updates and bumps the version of every group the user is in (member
+lists carry the name too), which retires cached responses and tells live
+subscribers to re-fetch. Expenses without snapshots (written before them) are
+still resolved at read time; `python -m app.scripts.propagate_names` fills
+them in and repairs a snapshot that raced a rename.
+"""
+import logging
+from typing import List
+from app.models.expense import set_user_name
+from app.models.group import bump_version, get_group_ids_for_member
+from app.models.user import UserLoader, find_user_ref
+from app.services import events
+
+logger = logging.getLogger(__name__)
+
+
+async def snapshot_names(docs: List[dict], loader: UserLoader = None):
+    """
+    Set paidByName / split userName on in-memory expenses that do not carry them
+    yet, with at most one user query for the batch.
+    """
+    loader = loader or UserLoader()
+    for doc in docs:
+        if "paidByName" not in doc:
+            loader.want_ids([doc["paidBy"]])
+        loader.want_ids(s["userId"] for s in doc.get("splits", []) if "userName" not in s)
+    await loader.load()
+    for doc in docs:
+        payer = loader.by_id(doc["paidBy"])
+        if payer and "paidByName" not in doc:
+            doc["paidByName"] = payer.name
+        for split in doc.get("splits", []):
+            ref = loader.by_id(split["userId"])
+            if ref and "userName" not in split:
+                split["userName"] = ref.name
+
+
+async def propagate_name(uid: str) -> int:
+    """Bring the user's name snapshots in line with their current name. Returns the expenses updated."""
+    user = await find_user_ref(uid)
+    if not user:
+        return 0
+    total = 0
+    for gid in await get_group_ids_for_member(uid):
+        total += await set_user_name(gid, uid, user.name)
+        version = await bump_version(gid)
+        await events.publish(gid, events.RESYNC, version, {})
+    logger.info("Propagated the name of user %s to %d expenses", uid, total)
+    return total
@@ -0,0 +1,135 @@
+"""
+Debt simplification over integer-cent balances.
+
+Input is a {userId: net cents} map (positive = is owed money, negative = owes),
+output a list of (from, to, cents) transfers that settles every balance.
+
+- `simplify_greedy`: repeatedly matches the largest creditor with the largest
+  debtor using two heaps. O(n log n), at most n - 1 transfers.
+- `simplify_exact`: minimum number of transfers. A group of n non-zero balances
+  needs n - k transfers where k is the largest number of disjoint zero-sum
+  subsets it splits into; k is found by a memoized DP over subsets, O(2^n * n),
+  so it is only used up to SIMPLIFY_EXACT_MAX members.
+- `simplify`: picks one of the above by group size (or an explicit mode).
+- `simplify_group`: `simplify` of a group's ledger, solved once per group
+  version (event publish, group detail and dashboard share the result).
+"""
+import heapq
+import os
+from typing import Dict, List, Optional, Tuple
+from app.utils.cache import TTLCache
+
+Transfer = Tuple[str, str, int]
+
+SIMPLIFY_EXACT_MAX = int(os.getenv("SIMPLIFY_EXACT_MAX", 12))
+
+# A group version fixes its ledger, so entries keyed by (group id, version) never go stale.
+DEBTS_CACHE_SIZE = int(os.getenv("DEBTS_CACHE_SIZE", 4096))
+debts_cache = TTLCache(maxsize=DEBTS_CACHE_SIZE, ttl=float(os.getenv("DEBTS_CACHE_TTL_SECONDS", 3600)))
+
+MODES = ("auto", "greedy", "exact")
+
+
+def _nonzero(balances: Dict[str, int]) -> List[Tuple[str, int]]:
+    # sorted so results do not depend on dict insertion order
+    return sorted((uid, int(amt)) for uid, amt in balances.items() if amt)
+
+
+def simplify_greedy(balances: Dict[str, int]) -> List[Transfer]:
+    creditors = [(-amt, uid) for uid, amt in _nonzero(balances) if amt > 0]
+    debtors = [(amt, uid) for uid, amt in _nonzero(balances) if amt < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append((debtor, creditor, amount))
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor))
+    return transfers
+
+
+def _zero_sum_groups(items: List[Tuple[str, int]]) -> List[List[Tuple[str, int]]]:
+    """Split items into the largest possible number of disjoint zero-sum groups."""
+    n = len(items)
+    full = (1 << n) - 1
+    amounts = [amt for _, amt in items]
+
+    sums = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        low = mask & -mask
+        sums[mask] = sums[mask ^ low] + amounts[low.bit_length() - 1]
+
+    # best[mask]: max zero-sum groups that the elements of `mask` can be ordered into,
+    # when elements are added one at a time and a group closes whenever the running sum is 0.
+    best = [0] * (full + 1)
+    last = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        value, choice = -1, 0
+        rest = mask
+        while rest:
+            bit = rest & -rest
+            rest ^= bit
+            if best[mask ^ bit] > value:
+                value, choice = best[mask ^ bit], bit
+        best[mask] = value + (1 if sums[mask] == 0 else 0)
+        last[mask] = choice
+
+    # Walk the optimal order backwards; every zero prefix sum closes a group.
+    order = []
+    mask = full
+    while mask:
+        bit = last[mask]
+        order.append((bit, mask))
+        mask ^= bit
+    groups, current = [], []
+    for bit, mask in reversed(order):
+        current.append(items[bit.bit_length() - 1])
+        if sums[mask] == 0:
+            groups.append(current)
+            current = []
+    if current:
+        groups.append(current)
+    return groups
+
+
+def simplify_exact(balances: Dict[str, int]) -> List[Transfer]:
+    transfers = []
+    for group in _zero_sum_groups(_nonzero(balances)):
+        # inside a zero-sum group of k members greedy needs exactly k - 1 transfers
+        transfers.extend(simplify_greedy(dict(group)))
+    return transfers
+
+
+def simplify(balances: Dict[str, int], mode: str = "auto", exact_max: int = SIMPLIFY_EXACT_MAX) -> List[Transfer]:
+    if mode not in MODES:
+        raise ValueError(f"Unknown simplify mode: {mode}")
+    if mode == "auto":
+        nonzero = sum(1 for amt in balances.values() if amt)
+        mode = "exact" if nonzero <= exact_max else "greedy"
+    if mode == "exact":
+        return simplify_exact(balances)
+    return simplify_greedy(balances)
+
+
+def simplify_group(gid: str, version: Optional[int], balances: Dict[str, int]) -> List[Transfer]:
+    """`simplify(balances)` for a group's ledger at `version`; cached per version (None: not cached)."""
+    if version is None:
+        return simplify(balances)
+    key = (gid, version)
+    transfers = debts_cache.get(key)
+    if transfers is None:
+        transfers = simplify(balances)
+        debts_cache.set(key, transfers)
+    return transfers
+
+
+def debts_out(gid: str, version: Optional[int], balances: Dict[str, int]) -> List[dict]:
+    """Simplified debts of a group's ledger at `version` in the API's [{from, to, amount}] shape."""
+    return [{"from": debtor, "to": creditor, "amount": cents / 100}
+            for debtor, creditor, cents in simplify_group(gid, version, balances)]
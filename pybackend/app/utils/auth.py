@@ -1,12 +1,21 @@
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from typing import Optional
+import hashlib
 import os
+import time
+from .cache import TTLCache
 
 SECRET_KEY = os.getenv("SECRET_KEY", "replace_this_with_a_strong_secret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60*24))
 
+# Verified payloads keyed by sha256(token), so the raw token is never kept in memory.
+# An entry never outlives the token's own `exp`.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", 300))
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -17,9 +26,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
 def verify_token(token: str):
+    key = token_digest(token)
+    payload = token_cache.get(key)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+    exp = payload.get("exp")
+    if exp is not None:
+        token_cache.set(key, payload, ttl=exp - time.time())
+    return payload
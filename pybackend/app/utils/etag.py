@@ -0,0 +1,52 @@
+import hashlib
+import os
+from typing import Awaitable, Callable
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from .cache import TTLCache
+from .singleflight import SingleFlight
+
+# Computed responses keyed by (route, group id, group version, variant). A new
+# version makes old keys unreachable, so entries never need explicit invalidation.
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 512))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 600))
+response_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS)
+# concurrent misses on the same key (e.g. every member reloading after a write) compute once
+response_flights = SingleFlight()
+
+
+def version_etag(route: str, group_id: str, version: int, variant: str = "") -> str:
+    """Strong ETag for a representation of a group at a given version."""
+    raw = f"{route}:{group_id}:{version}:{variant}"
+    return '"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: ignore W/ prefixes
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+async def computed_response(key: tuple, etag: str, compute: Callable[[], Awaitable[object]]) -> JSONResponse:
+    """
+    The cached response for `key`, or `await compute()` stored under it. Concurrent
+    callers missing the same key share one computation; key[0] labels the metrics.
+    """
+    content = response_cache.get(key)
+    if content is None:
+        async def fill():
+            encoded = jsonable_encoder(await compute())
+            response_cache.set(key, encoded)
+            return encoded
+        content = await response_flights.do(key, fill, label=key[0])
+    return JSONResponse(content, headers={"ETag": etag})
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -1,9 +1,49 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is deliberately slow (~100-300 ms) and would block the event loop, so the
+# async variants below run it on a small dedicated pool. bcrypt releases the GIL,
+# so threads give real parallelism. Once HASH_WORKERS + HASH_MAX_QUEUE calls are
+# in flight new ones are rejected immediately instead of piling up.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", 2))
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", 16))
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_in_flight = 0
+
+
+class HashPoolSaturated(Exception):
+    """Raised when the hashing pool already has its maximum number of queued calls."""
+
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
+
+
+async def _run_in_pool(fn, *args):
+    global _in_flight
+    if _in_flight >= HASH_WORKERS + HASH_MAX_QUEUE:
+        raise HashPoolSaturated()
+    _in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        _in_flight -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_pool(hash_password, password)
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _run_in_pool(verify_password, plain, hashed)
+
+
+def pool_stats() -> dict:
+    return {"workers": HASH_WORKERS, "maxQueue": HASH_MAX_QUEUE, "inFlight": _in_flight}
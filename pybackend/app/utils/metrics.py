@@ -0,0 +1,259 @@
+"""
+In-process metrics in Prometheus text format.
+
+- MetricsMiddleware times every request per (method, route template, status).
+- MongoCommandListener counts and times every MongoDB command, globally and
+  for the request that issued it (tracked through a contextvar; Motor copies
+  the context into its executor threads).
+- MongoPoolListener records how long operations wait to check a connection
+  out of the pool, and how many connections are open / in use.
+- Requests slower than SLOW_REQUEST_MS or issuing more than
+  SLOW_REQUEST_DB_COMMANDS commands are logged, so N+1 regressions stand out.
+
+`render()` produces the body served at /metrics.
+"""
+import contextvars
+import logging
+import os
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 500))
+SLOW_REQUEST_DB_COMMANDS = int(os.getenv("SLOW_REQUEST_DB_COMMANDS", 20))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values: Dict[Tuple, float] = defaultdict(float)
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] += amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, tuple(buckets)
+        self.series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            # [per-bucket counts..., +Inf count, sum]
+            series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                labels = _labels(self.labels + ("le",), key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+http_requests = Histogram(
+    "http_request_duration_seconds", "Request latency by route template.", ("method", "route", "status"))
+http_db_commands = Histogram(
+    "http_request_db_commands", "MongoDB commands issued per request.", ("route",), buckets=COUNT_BUCKETS)
+mongo_commands = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency.", ("command",))
+mongo_failures = Counter("mongo_command_failures_total", "Failed MongoDB commands.", ("command",))
+mongo_pool_wait = Histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("outcome",))
+
+METRICS = [http_requests, http_db_commands, mongo_commands, mongo_failures, mongo_pool_wait]
+
+# Extra gauge sources: callables yielding (name, help, {label: value}, value)
+_gauge_sources: List[Callable[[], Iterable[tuple]]] = []
+
+
+def register_gauges(fn: Callable[[], Iterable[tuple]]):
+    _gauge_sources.append(fn)
+
+
+def render() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    gauges: Dict[str, tuple] = {}
+    for source in _gauge_sources:
+        for name, help, labels, value in source():
+            gauges.setdefault(name, (help, []))[1].append((tuple(labels), tuple(labels.values()), value))
+    for name, (help, samples) in gauges.items():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} gauge")
+        for label_names, label_values, value in samples:
+            lines.append(f"{name}{_labels(label_names, label_values)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    __slots__ = ("db_commands", "db_seconds")
+
+    def __init__(self):
+        self.db_commands = 0
+        self.db_seconds = 0.0
+
+
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def started(self, event):
+        stats = current_request.get()
+        if stats is not None:
+            stats.db_commands += 1
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        mongo_failures.inc(event.command_name)
+        self._finished(event)
+
+    def _finished(self, event):
+        seconds = event.duration_micros / 1e6
+        mongo_commands.observe(seconds, event.command_name)
+        stats = current_request.get()
+        if stats is not None:
+            stats.db_seconds += seconds
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Checkout wait times plus open / in-use connection counts per server."""
+
+    def __init__(self):
+        self.open: Dict[str, int] = defaultdict(int)
+        self.in_use: Dict[str, int] = defaultdict(int)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        address = "%s:%s" % event.address
+        self.open.pop(address, None)
+        self.in_use.pop(address, None)
+
+    def connection_created(self, event):
+        self.open["%s:%s" % event.address] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        address = "%s:%s" % event.address
+        self.open[address] = max(0, self.open[address] - 1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        mongo_pool_wait.observe(getattr(event, "duration", None) or 0.0, "failed")
+
+    def connection_checked_out(self, event):
+        mongo_pool_wait.observe(getattr(event, "duration", None) or 0.0, "ok")
+        self.in_use["%s:%s" % event.address] += 1
+
+    def connection_checked_in(self, event):
+        address = "%s:%s" % event.address
+        self.in_use[address] = max(0, self.in_use[address] - 1)
+
+    def gauges(self):
+        for address, count in list(self.open.items()):
+            yield "mongo_pool_connections_open", "Open pooled connections.", {"address": address}, count
+        for address, count in list(self.in_use.items()):
+            yield "mongo_pool_connections_in_use", "Checked-out pooled connections.", {"address": address}, count
+
+
+def _route_label(scope) -> str:
+    """
+    Route template of the matched endpoint, e.g. "/api/groups/{group_id}", which
+    keeps label cardinality bounded. Depending on the FastAPI version the route of
+    an included router may not carry the include prefix; it is taken from the
+    concrete path then (prefixes are static).
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if not template:
+        return "unmatched"
+    path = scope["path"]
+    extra = path.rstrip("/").count("/") - template.rstrip("/").count("/")
+    if extra > 0 and not path.startswith(template.split("{", 1)[0]):
+        prefix = "/".join(path.split("/")[:extra + 1])
+        template = prefix + template
+    return template
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware, so streaming responses are timed until their last byte."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                status["stream"] = any(name == b"content-type" and value.startswith(b"text/event-stream")
+                                       for name, value in message.get("headers", ()))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            if status.get("stream"):
+                # event streams stay open for minutes: not a latency sample
+                return
+            route_label = _route_label(scope)
+            http_requests.observe(elapsed, scope["method"], route_label, status["code"])
+            http_db_commands.observe(stats.db_commands, route_label)
+            if elapsed * 1000 > SLOW_REQUEST_MS or stats.db_commands > SLOW_REQUEST_DB_COMMANDS:
+                logger.warning(
+                    "Slow request %s %s -> %s: %.1f ms, %d db commands (%.1f ms in db)",
+                    scope["method"], scope["path"], status["code"], elapsed * 1000,
+                    stats.db_commands, stats.db_seconds * 1000,
+                )
@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+from bson import ObjectId
+
+# Keyset pagination over (date, _id), newest first.
+# Cursors are opaque to clients: urlsafe base64 of {"d": iso date, "i": ObjectId hex}.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+NEWEST_FIRST = [("date", -1), ("_id", -1)]
+
+
+def encode_cursor(date: datetime, oid: ObjectId) -> str:
+    raw = json.dumps({"d": date.isoformat(), "i": str(oid)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Raises ValueError for anything that is not a cursor we issued."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["d"]), ObjectId(data["i"])
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def before_filter(cursor: Optional[str]) -> dict:
+    """Filter selecting documents strictly after `cursor` in newest-first order."""
+    if not cursor:
+        return {}
+    date, oid = decode_cursor(cursor)
+    return {"$or": [{"date": {"$lt": date}}, {"date": date, "_id": {"$lt": oid}}]}
+
+
+def split_page(docs: List[dict], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """
+    `docs` is the result of a query run with limit + 1.
+    Returns the page and the cursor for the next one (None on the last page).
+    """
+    if len(docs) <= limit:
+        return docs, None
+    page = docs[:limit]
+    last = page[-1]
+    return page, encode_cursor(last["date"], last["_id"])
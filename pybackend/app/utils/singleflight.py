@@ -0,0 +1,47 @@
+"""
+Single-flight execution of identical concurrent computations.
+
+`SingleFlight.do(key, fn)` runs `fn()` once per key at a time: callers that
+arrive while it is in flight await the same result (or exception) instead of
+starting their own. The computation runs as its own task, so a leader whose
+client disconnects does not cancel it for the others. Nothing is kept once it
+finishes; reuse after that is the response cache's job.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from . import metrics
+
+coalesced_requests = metrics.Counter(
+    "singleflight_requests_total", "Cache misses computed (leader) or joined in flight (shared).", ("route", "outcome"))
+metrics.METRICS.append(coalesced_requests)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], label: str = "") -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            coalesced_requests.inc(label, "leader")
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            coalesced_requests.inc(label, "shared")
+        return await asyncio.shield(task)
+
+    def __len__(self):
+        return len(self._inflight)
+
+
+def coalescing_gauges():
+    totals: Dict[str, Dict[str, float]] = {}
+    for (route, outcome), count in coalesced_requests.values.items():
+        totals.setdefault(route, {"leader": 0, "shared": 0})[outcome] += count
+    for route, counts in totals.items():
+        ratio = counts["shared"] / (counts["leader"] + counts["shared"])
+        yield "singleflight_coalescing_ratio", "Share of cache misses served by an in-flight computation.", {"route": route}, ratio
+
+
+metrics.register_gauges(coalescing_gauges)
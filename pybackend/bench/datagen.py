@@ -0,0 +1,143 @@
+"""
+Deterministic synthetic dataset for benchmarks.
+
+Users, groups of a configurable size and expenses with a realistic split
+fan-out (mostly 2-4 people, sometimes the whole group), all derived from one
+seed so two runs produce identical data. `large_group_expenses` adds one more
+group with that many expenses (for search / autocomplete), drawn from its own
+seeded rng so the rest of the dataset does not change with it. Expenses are written through
+record_expenses so ledgers, timelines and group versions stay consistent with
+what the API would have produced.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional
+from bson import ObjectId
+
+# expenses are dated over config.days from here
+START = datetime(2024, 1, 1)
+DESCRIPTIONS = ["Dinner", "Groceries", "Taxi", "Rent", "Tickets", "Coffee", "Hotel", "Fuel"]
+
+
+@dataclass
+class DatasetConfig:
+    seed: int = 42
+    users: int = 200
+    groups: int = 40
+    group_size: int = 6
+    expenses_per_group: int = 200
+    large_group_expenses: int = 0
+    days: int = 365
+    batch_size: int = 1000
+
+
+@dataclass
+class BenchUser:
+    id: str
+    email: str
+    name: str
+    token: str = ""
+
+
+@dataclass
+class BenchGroup:
+    id: str
+    member_ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Dataset:
+    config: DatasetConfig
+    users: List[BenchUser]
+    groups: List[BenchGroup]
+    large_group: Optional[BenchGroup] = None
+
+
+def _split_fanout(rng: random.Random, size: int) -> int:
+    roll = rng.random()
+    if roll < 0.15:
+        return size
+    return min(size, rng.choice([2, 2, 2, 3, 3, 4]))
+
+
+def _expense(rng: random.Random, group: BenchGroup, date: datetime) -> dict:
+    members = group.member_ids
+    payer = rng.choice(members)
+    participants = rng.sample(members, _split_fanout(rng, len(members)))
+    cents_each = rng.randint(100, 15000)
+    splits = [{"userId": uid, "amount": cents_each / 100} for uid in participants]
+    return {
+        "groupId": group.id,
+        "paidBy": payer,
+        "amount": round(cents_each * len(participants) / 100, 2),
+        "description": rng.choice(DESCRIPTIONS),
+        "splits": splits,
+        "type": "expense",
+        "date": date,
+    }
+
+
+async def generate(config: DatasetConfig) -> Dataset:
+    # imported lazily so callers can point the app at a database first
+    from app.db.connection import users as users_col, groups as groups_col
+    from app.services.expenses import record_expenses
+    from app.utils.auth import create_access_token
+    from app.utils.hash import hash_password
+
+    rng = random.Random(config.seed)
+    password = hash_password("bench-password")  # one bcrypt call shared by every user
+
+    users = []
+    for i in range(config.users):
+        oid = ObjectId(rng.getrandbits(96).to_bytes(12, "big"))
+        users.append(BenchUser(id=str(oid), email=f"user{i}@bench.example", name=f"Bench User {i}"))
+    for u in users:
+        u.token = create_access_token({"id": u.id, "email": u.email})
+
+    groups = []
+    group_docs = []
+    for g in range(config.groups):
+        oid = ObjectId(rng.getrandbits(96).to_bytes(12, "big"))
+        members = rng.sample(users, min(config.group_size, len(users)))
+        groups.append(BenchGroup(id=str(oid), member_ids=[m.id for m in members]))
+        group_docs.append({
+            "_id": oid, "name": f"Bench Group {g}", "members": [m.id for m in members],
+            "createdBy": members[0].id, "version": 0,
+        })
+    large_group, large_rng = None, random.Random(config.seed + 1)
+    if config.large_group_expenses:
+        oid = ObjectId(large_rng.getrandbits(96).to_bytes(12, "big"))
+        members = large_rng.sample(users, min(config.group_size, len(users)))
+        large_group = BenchGroup(id=str(oid), member_ids=[m.id for m in members])
+        group_docs.append({
+            "_id": oid, "name": "Bench Large Group", "members": [m.id for m in members],
+            "createdBy": members[0].id, "version": 0,
+        })
+    memberships = {u.id: [] for u in users}
+    for group in groups + ([large_group] if large_group else []):
+        for uid in group.member_ids:
+            memberships[uid].append(group.id)
+    await users_col.insert_many([
+        {"_id": ObjectId(u.id), "name": u.name, "email": u.email, "password": password,
+         "groups": memberships[u.id]}
+        for u in users
+    ])
+    await groups_col.insert_many(group_docs)
+
+    span = timedelta(days=config.days).total_seconds()
+    batch = []
+    plan = [(group, config.expenses_per_group, rng) for group in groups]
+    if large_group:
+        plan.append((large_group, config.large_group_expenses, large_rng))
+    for group, count, group_rng in plan:
+        for _ in range(count):
+            date = START + timedelta(seconds=int(group_rng.random() * span))
+            batch.append(_expense(group_rng, group, date.replace(microsecond=0)))
+            if len(batch) >= config.batch_size:
+                await record_expenses(batch)
+                batch = []
+    if batch:
+        await record_expenses(batch)
+
+    return Dataset(config=config, users=users, groups=groups, large_group=large_group)
@@ -0,0 +1,118 @@
+"""
+Storage size and scan throughput of the legacy vs v2 expense documents.
+
+Usage:
+    python -m bench.expense_storage --mongo-url mongodb://localhost:27017 --expenses 1000000
+    python -m bench.expense_storage --local --expenses 1000000
+
+Generates the same seeded synthetic expenses (datagen's split fan-out) in both
+storage shapes (see app/models/expense.py). Against a server they are loaded
+into two scratch collections with the group_date index, and the report has
+collStats sizes plus two scans: a full cursor read through expense_deltas
+(what a ledger rebuild does) and a server-side $unwind/$group over the splits
+(what a stats rebuild does). --local needs no server: it measures raw BSON
+sizes and decode + expense_deltas throughput in process.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import bson
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient
+
+from app.models.expense import to_storage
+from app.models.ledger import expense_deltas
+from bench.datagen import BenchGroup, _expense
+
+GROUP_SIZE = 6
+EXPENSES_PER_GROUP = 200
+SPLIT_TOTALS = [
+    {"$unwind": "$splits"},
+    {"$group": {"_id": {"$ifNull": ["$splits.u", "$splits.userId"]},
+                "cents": {"$sum": {"$ifNull": ["$splits.c", {"$multiply": ["$splits.amount", 100]}]}}}},
+]
+
+
+def legacy_expenses(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    group = None
+    for i in range(count):
+        if i % EXPENSES_PER_GROUP == 0:
+            members = [str(ObjectId(rng.getrandbits(96).to_bytes(12, "big"))) for _ in range(GROUP_SIZE)]
+            group = BenchGroup(id=str(ObjectId(rng.getrandbits(96).to_bytes(12, "big"))), member_ids=members)
+        yield _expense(rng, group, start + timedelta(seconds=rng.randrange(365 * 86400)))
+
+
+def _batches(docs, size=10000):
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _scan(docs) -> int:
+    touched = 0
+    for doc in docs:
+        touched += len(expense_deltas(doc))
+    return touched
+
+
+def run_local(count: int):
+    for shape, convert in (("legacy", dict), ("v2", to_storage)):
+        encoded = [bson.encode(convert(doc)) for doc in legacy_expenses(count)]
+        size = sum(map(len, encoded))
+        blob = b"".join(encoded)
+        del encoded
+        start = time.perf_counter()
+        _scan(bson.decode_all(blob))
+        elapsed = time.perf_counter() - start
+        print(f"{shape:>6}: {size / 2**20:8.1f} MiB BSON, {size / count:6.1f} B/doc, "
+              f"decode+deltas {count / elapsed:,.0f} docs/s")
+
+
+def run_server(url: str, db_name: str, count: int, keep: bool):
+    database = MongoClient(url)[db_name]
+    for shape, convert in (("legacy", dict), ("v2", to_storage)):
+        collection = database[f"bench_expenses_{shape}"]
+        collection.drop()
+        collection.create_indexes([IndexModel([("groupId", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)])])
+        for batch in _batches(map(convert, legacy_expenses(count))):
+            collection.insert_many(batch, ordered=False)
+
+        stats = database.command("collStats", collection.name)
+        start = time.perf_counter()
+        _scan(collection.find({}, batch_size=10000))
+        cursor_rate = count / (time.perf_counter() - start)
+        start = time.perf_counter()
+        list(collection.aggregate(SPLIT_TOTALS, allowDiskUse=True))
+        unwind_rate = count / (time.perf_counter() - start)
+        print(f"{shape:>6}: size {stats['size'] / 2**20:8.1f} MiB, avgObjSize {stats['avgObjSize']:6.1f} B, "
+              f"storageSize {stats['storageSize'] / 2**20:8.1f} MiB, indexes {stats['totalIndexSize'] / 2**20:6.1f} MiB | "
+              f"cursor scan {cursor_rate:,.0f} docs/s, $unwind/$group {unwind_rate:,.0f} docs/s")
+        if not keep:
+            collection.drop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="splitwise_bench")
+    parser.add_argument("--expenses", type=int, default=1_000_000)
+    parser.add_argument("--local", action="store_true", help="measure BSON in process, no server")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch collections")
+    args = parser.parse_args()
+    if args.local:
+        run_local(args.expenses)
+    else:
+        run_server(args.mongo_url, args.db, args.expenses, args.keep)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Throughput of the streaming bulk import endpoint, in rows per second.
+
+Usage (against a running server):
+    python bench/import_throughput.py --url http://localhost:8000 --rows 100000 --format ndjson
+
+Registers two throwaway users and a group, then streams `--rows` generated
+expenses to POST /api/expenses/import without building the body in memory,
+and prints rows/s together with the server's inserted/failed counts.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+
+
+async def register_and_login(client, name):
+    creds = {"email": f"bench-{name}-{uuid.uuid4().hex[:8]}@example.com", "password": "bench-password"}
+    r = await client.post("/api/auth/register", json={"name": name, **creds})
+    r.raise_for_status()
+    uid = r.json()["id"]
+    r = await client.post("/api/auth/login", json=creds)
+    r.raise_for_status()
+    return uid, creds["email"], r.cookies
+
+
+async def body(fmt, rows, gid, payer, other):
+    if fmt == "csv":
+        yield b"groupId,paidBy,amount,description,splits\n"
+    for i in range(rows):
+        if fmt == "csv":
+            line = f"{gid},{payer},30,bench row {i},{payer}:15;{other}:15\n"
+        else:
+            line = json.dumps({
+                "groupId": gid, "paidBy": payer, "amount": 30, "description": f"bench row {i}",
+                "splits": [{"userId": payer, "amount": 15}, {"userId": other, "amount": 15}],
+            }) + "\n"
+        yield line.encode()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="ndjson")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+        payer, _, cookies = await register_and_login(client, "Payer")
+        other, other_email, _ = await register_and_login(client, "Other")
+        client.cookies = cookies
+        r = await client.post("/api/groups", json={"name": "bench import", "members": [other_email]})
+        r.raise_for_status()
+        gid = r.json()["id"]
+
+        start = time.perf_counter()
+        r = await client.post(
+            f"/api/expenses/import?format={args.format}",
+            content=body(args.format, args.rows, gid, payer, other),
+        )
+        elapsed = time.perf_counter() - start
+        r.raise_for_status()
+        result = r.json()
+
+    print(f"{args.rows} {args.format} rows in {elapsed:.2f}s: {args.rows / elapsed:,.0f} rows/s")
+    print(f"inserted={result['inserted']} failed={result['failed']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
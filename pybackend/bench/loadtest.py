@@ -0,0 +1,270 @@
+"""
+Load test every router through an in-process ASGI client.
+
+Usage:
+    python -m bench.loadtest --mongo-url mongodb://localhost:27017 [options]
+    python -m bench.loadtest --in-process [options]
+
+--mongo-url runs against a real mongod, using (and first dropping) the
+--db database. --in-process uses mongomock_motor as an in-memory stand-in
+(pip install mongomock-motor); it lacks some aggregation features, so some
+scenarios will report errors there, and timings are not representative of
+a real server.
+
+A deterministic dataset is generated first (see bench/datagen.py). Then
+each scenario sends --requests requests at --concurrency. The report gives
+p50/p95/p99 latency, requests per second and Mongo round trips per request.
+--output writes the report as JSON. --baseline compares against an earlier
+report and exits 1 if a metric regressed by more than --tolerance percent.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import zlib
+from dataclasses import asdict
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench import datagen, roundtrips  # noqa: E402
+from bench.datagen import DatasetConfig  # noqa: E402
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _member(rng, dataset, group):
+    uid = rng.choice(group.member_ids)
+    return next(u for u in dataset.users if u.id == uid)
+
+
+def _stats_months(config):
+    """The "from=YYYY-MM&to=YYYY-MM" range the dataset's expenses are dated in."""
+    last = datagen.START + timedelta(days=config.days)
+    return f"from={datagen.START:%Y-%m}&to={last:%Y-%m}"
+
+
+# Each scenario builds (method, path, user, json body or raw bytes) from a seeded rng.
+def _scenarios(dataset):
+    months = _stats_months(dataset.config)
+
+    def pick(rng):
+        group = rng.choice(dataset.groups)
+        return group, _member(rng, dataset, group)
+
+    def get(path_fn):
+        def build(rng):
+            group, user = pick(rng)
+            return "GET", path_fn(group), user, None
+        return build
+
+    def large(rng):
+        # search / autocomplete scenarios target the large group when there is one
+        group = dataset.large_group or rng.choice(dataset.groups)
+        return group, _member(rng, dataset, group)
+
+    def search(rng):
+        group, user = large(rng)
+        word = rng.choice(datagen.DESCRIPTIONS).lower()
+        return "GET", f"/api/expenses/group/{group.id}/search?q={word}&minAmount={rng.randint(0, 200)}", user, None
+
+    def suggest(rng):
+        group, user = large(rng)
+        prefix = rng.choice(datagen.DESCRIPTIONS)[:rng.randint(1, 3)].lower()
+        return "GET", f"/api/expenses/group/{group.id}/suggest?prefix={prefix}", user, None
+
+    def add_expense(rng):
+        group, user = pick(rng)
+        other = rng.choice(group.member_ids)
+        return "POST", "/api/expenses", user, {
+            "groupId": group.id, "paidBy": user.id, "amount": 20, "description": "bench",
+            "splits": [{"userId": user.id, "amount": 10}, {"userId": other, "amount": 10}],
+        }
+
+    def add_settlement(rng):
+        group, user = pick(rng)
+        other = rng.choice(group.member_ids)
+        return "POST", "/api/settlements", user, {
+            "groupId": group.id, "payerId": user.id, "receiverId": other, "amount": 5,
+        }
+
+    def bulk_import(rng):
+        group, user = pick(rng)
+        line = json.dumps({"groupId": group.id, "paidBy": user.id, "amount": 4,
+                           "splits": [{"userId": uid, "amount": 4 / len(group.member_ids)} for uid in group.member_ids]})
+        return "POST", "/api/expenses/import?format=ndjson", user, ("\n".join([line] * 10) + "\n").encode()
+
+    return {
+        "root": get(lambda g: "/"),
+        "auth.me": get(lambda g: "/api/auth/me"),
+        "groups.list": get(lambda g: "/api/groups"),
+        "groups.detail": get(lambda g: f"/api/groups/{g.id}"),
+        "expenses.page": get(lambda g: f"/api/expenses/group/{g.id}"),
+        "expenses.export": get(lambda g: f"/api/expenses/group/{g.id}/export?format=ndjson"),
+        "expenses.search": search,
+        "expenses.suggest": suggest,
+        "settlements.balances": get(lambda g: f"/api/settlements/group/{g.id}"),
+        "activity": get(lambda g: "/api/activity"),
+        "dashboard": get(lambda g: "/api/dashboard"),
+        "groups.stats": get(lambda g: f"/api/groups/{g.id}/stats?{months}"),
+        "stats.me": get(lambda g: f"/api/stats/me?{months}"),
+        "expenses.create": add_expense,
+        "settlements.create": add_settlement,
+        "expenses.import": bulk_import,
+    }
+
+
+async def run_scenario(client, build, requests, concurrency, seed):
+    rng = random.Random(seed)
+    plans = [build(rng) for _ in range(requests)]
+    latencies, trips, errors = [], [], 0
+    queue = iter(plans)
+
+    async def worker():
+        nonlocal errors
+        for method, path, user, body in queue:
+            counter = roundtrips.RoundTrips()
+            token = roundtrips.current.set(counter)
+            headers = {"Authorization": f"Bearer {user.token}"}
+            kwargs = {"content": body} if isinstance(body, bytes) else {"json": body} if body else {}
+            start = time.perf_counter()
+            try:
+                r = await client.request(method, path, headers=headers, **kwargs)
+                if r.status_code >= 400:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+            roundtrips.current.reset(token)
+            trips.append(counter.count)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50": round(percentile(latencies, 50), 2),
+        "p95": round(percentile(latencies, 95), 2),
+        "p99": round(percentile(latencies, 99), 2),
+        "mean": round(statistics.fmean(latencies), 2),
+        "roundTrips": round(statistics.fmean(trips), 2),
+    }
+
+
+# metric -> True if higher is better
+METRICS = {"p50": False, "p95": False, "p99": False, "rps": True, "roundTrips": False}
+
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    print(f"\n{'scenario':22} {'metric':10} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, current in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = before.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            flag = " !" if worse > tolerance else ""
+            if flag:
+                regressions.append((name, metric))
+            print(f"{name:22} {metric:10} {old:10} {new:10} {change:+7.1f}%{flag}")
+    return regressions
+
+
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--mongo-url")
+    target.add_argument("--in-process", action="store_true")
+    parser.add_argument("--db", default="splitwise_bench")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--groups", type=int, default=40)
+    parser.add_argument("--group-size", type=int, default=6)
+    parser.add_argument("--expenses-per-group", type=int, default=200)
+    parser.add_argument("--large-group-expenses", type=int, default=10000,
+                        help="expenses of the extra group the search / suggest scenarios use (0: none)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenarios", help="comma-separated subset of scenario names")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="allowed regression in percent")
+    args = parser.parse_args(argv)
+
+    # The app builds its Mongo client at import time, so configure it first.
+    if args.in_process:
+        import motor.motor_asyncio
+        import mongomock_motor
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+        roundtrips.instrument_stand_in()
+    else:
+        os.environ["MONGO_URL"] = args.mongo_url
+        roundtrips.install_listener()
+    os.environ["DB_NAME"] = args.db
+
+    import httpx
+    from app.main import app
+    from app.db.connection import get_client
+    from app.db.indexes import ensure_indexes
+    from bench.datagen import generate
+
+    await get_client().drop_database(args.db)
+    await ensure_indexes()
+    config = DatasetConfig(seed=args.seed, users=args.users, groups=args.groups,
+                           group_size=args.group_size, expenses_per_group=args.expenses_per_group,
+                           large_group_expenses=args.large_group_expenses)
+    start = time.perf_counter()
+    dataset = await generate(config)
+    print(f"generated dataset in {time.perf_counter() - start:.1f}s: {asdict(config)}")
+
+    scenarios = _scenarios(dataset)
+    if args.scenarios:
+        scenarios = {name: scenarios[name] for name in args.scenarios.split(",")}
+
+    report = {
+        "meta": {"target": "in-process" if args.in_process else "mongod", "dataset": asdict(config),
+                 "requests": args.requests, "concurrency": args.concurrency},
+        "scenarios": {},
+    }
+    print(f"{'scenario':22} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'trips':>6} {'errors':>6}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, build in scenarios.items():
+            # seeded per scenario name so running a subset replays the same requests
+            seed = args.seed + zlib.crc32(name.encode())
+            result = await run_scenario(client, build, args.requests, args.concurrency, seed)
+            report["scenarios"][name] = result
+            print(f"{name:22} {result['rps']:8} {result['p50']:8} {result['p95']:8} {result['p99']:8} "
+                  f"{result['roundTrips']:6} {result['errors']:6}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(report, json.load(fh), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
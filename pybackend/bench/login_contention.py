@@ -0,0 +1,73 @@
+"""
+Latency of an unrelated endpoint while logins hammer the bcrypt pool.
+
+Usage (against a running server):
+    python bench/login_contention.py --url http://localhost:8000 --logins 32 --seconds 10
+
+Registers a throwaway user, then runs `--logins` concurrent login loops while
+a single probe loop keeps calling GET / and records its latency. Prints
+p50/p95/p99 of the probe and the login outcome counts (200 vs 503).
+With bcrypt on the event loop the probe p99 tracks the bcrypt cost times the
+number of queued logins; with the worker pool it should stay near the
+baseline measured with --logins 0.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def login_loop(client, creds, deadline, outcomes):
+    while time.monotonic() < deadline:
+        r = await client.post("/api/auth/login", json=creds)
+        outcomes[r.status_code] = outcomes.get(r.status_code, 0) + 1
+
+
+async def probe_loop(client, deadline, samples):
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        await client.get("/")
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=32, help="concurrent login loops")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    creds = {"email": f"bench-{uuid.uuid4().hex[:8]}@example.com", "password": "bench-password"}
+    limits = httpx.Limits(max_connections=args.logins + 8)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        r = await client.post("/api/auth/register", json={"name": "Bench", **creds})
+        r.raise_for_status()
+
+        deadline = time.monotonic() + args.seconds
+        samples, outcomes = [], {}
+        await asyncio.gather(
+            probe_loop(client, deadline, samples),
+            *(login_loop(client, creds, deadline, outcomes) for _ in range(args.logins)),
+        )
+
+    print(f"concurrent logins: {args.logins}, probe requests: {len(samples)}")
+    print(f"probe GET / latency ms: p50={percentile(samples, 50):.1f} "
+          f"p95={percentile(samples, 95):.1f} p99={percentile(samples, 99):.1f} "
+          f"mean={statistics.fmean(samples) if samples else 0:.1f}")
+    print(f"login responses: {dict(sorted(outcomes.items()))}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+Count MongoDB round trips per benchmark request.
+
+Each request runs with a fresh RoundTrips object in a contextvar. Against a
+real mongod a PyMongo CommandListener increments it for every command (Motor
+copies the context into its executor threads, so attribution survives the
+thread hop). With the in-process stand-in the mongomock_motor collection
+methods are wrapped instead; there a find()/aggregate() counts as one round
+trip regardless of how many batches it would need on a real server.
+"""
+import contextvars
+from pymongo import monitoring
+
+current = contextvars.ContextVar("bench_roundtrips", default=None)
+
+
+class RoundTrips:
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+
+def _bump():
+    counter = current.get()
+    if counter is not None:
+        counter.count += 1
+
+
+class _Listener(monitoring.CommandListener):
+    def started(self, event):
+        _bump()
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def install_listener():
+    """Must run before the app creates its client: global listeners only apply to new clients."""
+    monitoring.register(_Listener())
+
+
+def instrument_stand_in():
+    import mongomock_motor
+
+    cls = mongomock_motor.AsyncMongoMockCollection
+    for name in ("find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+                 "delete_one", "delete_many", "count_documents", "distinct", "bulk_write",
+                 "find_one_and_update", "create_indexes"):
+        original = getattr(cls, name)
+
+        async def wrapper(self, *args, __original=original, **kwargs):
+            _bump()
+            return await __original(self, *args, **kwargs)
+
+        setattr(cls, name, wrapper)
+
+    for name in ("find", "aggregate"):
+        original = getattr(cls, name)
+
+        def wrapper(self, *args, __original=original, **kwargs):
+            _bump()
+            return __original(self, *args, **kwargs)
+
+        setattr(cls, name, wrapper)
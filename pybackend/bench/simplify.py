@@ -0,0 +1,65 @@
+"""
+Debt-simplification benchmark over randomized groups.
+
+Usage:
+    python bench/simplify.py [--sizes 5,8,10,12,14,16,25,50,100,250,500] [--trials 20] [--seed 1]
+
+For each group size, generates `--trials` random zero-sum balance maps (in
+cents, with some members sharing amounts so zero-sum subsets actually occur)
+and reports the mean time and mean transfer count of the greedy and exact
+solvers. The exact solver is skipped above --exact-limit members. Use the
+output to tune SIMPLIFY_EXACT_MAX.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.simplify import simplify_exact, simplify_greedy  # noqa: E402
+
+
+def random_balances(rng: random.Random, members: int) -> dict:
+    # a few "round" share sizes make zero-sum subgroups common, as in real groups
+    shares = [rng.choice([500, 1000, 1250, 2000, 3333, 4999]) for _ in range(members - 1)]
+    amounts = [share * rng.choice([-1, 1]) * rng.randint(1, 4) for share in shares]
+    amounts.append(-sum(amounts))
+    return {f"u{i}": amt for i, amt in enumerate(amounts)}
+
+
+def run(fn, cases):
+    timings, counts = [], []
+    for balances in cases:
+        start = time.perf_counter()
+        transfers = fn(balances)
+        timings.append((time.perf_counter() - start) * 1000)
+        counts.append(len(transfers))
+    return statistics.fmean(timings), statistics.fmean(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="5,8,10,12,14,16,25,50,100,250,500")
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--exact-limit", type=int, default=16)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'members':>8} {'greedy ms':>10} {'greedy tx':>10} {'exact ms':>10} {'exact tx':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        cases = [random_balances(rng, size) for _ in range(args.trials)]
+        g_ms, g_tx = run(simplify_greedy, cases)
+        if size <= args.exact_limit:
+            e_ms, e_tx = run(simplify_exact, cases)
+            exact = f"{e_ms:10.3f} {e_tx:10.2f}"
+        else:
+            exact = f"{'-':>10} {'-':>10}"
+        print(f"{size:8d} {g_ms:10.3f} {g_tx:10.2f} {exact}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+The tests run the app in process against mongomock_motor, an in-memory
+stand-in for MongoDB (pip install -r bench/requirements.txt):
+    python -m pytest tests
+Each test starts from an empty database.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+try:
+    import mongomock.collection
+    import mongomock_motor
+except ImportError:
+    mongomock_motor = None
+    collect_ignore_glob = ["test_*.py"]
+else:
+    import motor.motor_asyncio
+
+    # app.db.connection imports AsyncIOMotorClient by name, so swap it before the app is imported
+    motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    os.environ.setdefault("DB_NAME", "splitwise_test")
+
+    # pymongo 4.9+ passes `sort` to bulk updates / replaces; mongomock's builder does not take it
+    def _ignore_sort(method):
+        def wrapper(self, *args, sort=None, **kwargs):
+            return method(self, *args, **kwargs)
+        return wrapper
+
+    _builder = mongomock.collection.BulkOperationBuilder
+    _builder.add_update = _ignore_sort(_builder.add_update)
+    _builder.add_replace = _ignore_sort(_builder.add_replace)
+
+
+@pytest.fixture(autouse=True)
+def empty_database():
+    from app.db.connection import DB_NAME, get_client
+    asyncio.run(get_client().drop_database(DB_NAME))
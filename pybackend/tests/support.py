@@ -0,0 +1,34 @@
+"""Helpers shared by the API tests."""
+import httpx
+
+from app.main import app
+
+PASSWORD = "secret1"
+
+
+def client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def register(client: httpx.AsyncClient, *names: str) -> dict:
+    """Register a user per name (email `<name>@example.com`); returns {name: user id}."""
+    ids = {}
+    for name in names:
+        r = await client.post("/api/auth/register",
+                              json={"name": name.title(), "email": f"{name}@example.com", "password": PASSWORD})
+        assert r.status_code == 201, r.text
+        ids[name] = r.json()["id"]
+    return ids
+
+
+async def sign_in(client: httpx.AsyncClient, name: str):
+    r = await client.post("/api/auth/login", json={"email": f"{name}@example.com", "password": PASSWORD})
+    assert r.status_code == 200, r.text
+    client.cookies.set("access_token", r.cookies["access_token"])
+
+
+async def create_group(client: httpx.AsyncClient, *member_names: str) -> str:
+    """A group of the signed-in user and the named users; returns its id."""
+    r = await client.post("/api/groups", json={"name": "Trip", "members": [f"{n}@example.com" for n in member_names]})
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
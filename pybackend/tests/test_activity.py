@@ -0,0 +1,45 @@
+"""Activity fan-out trims timelines to the cap, but not on every write."""
+import asyncio
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.db.connection import activity
+from app.models import activity as activity_model
+
+MEMBERS = ["u1", "u2"]
+
+
+def _expense(day: int) -> dict:
+    return {"_id": ObjectId(), "groupId": "g", "type": "expense", "description": f"day {day}", "amount": 1.0,
+            "date": datetime(2024, 1, 1) + timedelta(days=day)}
+
+
+async def _fan_out_days(days):
+    for day in days:
+        await activity_model.fan_out([_expense(day)], MEMBERS)
+    return sorted([doc["description"] async for doc in activity.find({"userId": "u1"})])
+
+
+def test_due_trim_keeps_the_newest_cap_entries(monkeypatch):
+    monkeypatch.setattr(activity_model, "ACTIVITY_CAP", 3)
+    monkeypatch.setattr(activity_model, "ACTIVITY_TRIM_EVERY", 1)
+    assert asyncio.run(_fan_out_days(range(6))) == ["day 3", "day 4", "day 5"]
+
+
+def test_single_writes_skip_the_trim_until_due(monkeypatch):
+    monkeypatch.setattr(activity_model, "ACTIVITY_CAP", 3)
+    monkeypatch.setattr(activity_model, "ACTIVITY_TRIM_EVERY", 50)
+    monkeypatch.setattr(activity_model.random, "random", lambda: 0.5)
+    assert len(asyncio.run(_fan_out_days(range(6)))) == 6
+
+
+def test_batch_of_at_least_trim_every_always_trims(monkeypatch):
+    monkeypatch.setattr(activity_model, "ACTIVITY_CAP", 3)
+    monkeypatch.setattr(activity_model, "ACTIVITY_TRIM_EVERY", 4)
+    monkeypatch.setattr(activity_model.random, "random", lambda: 0.99)
+
+    async def run():
+        await activity_model.fan_out([_expense(day) for day in range(5)], MEMBERS)
+        return await activity.count_documents({"userId": "u2"})
+    assert asyncio.run(run()) == 3
@@ -0,0 +1,86 @@
+"""Balance checkpoints: point-in-time balances, invalidation and compaction."""
+import asyncio
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.db.connection import checkpoints
+from app.models import checkpoint
+from app.models.expense import create_expenses
+from app.services.expenses import record_expenses
+
+GID, ANN, BEN = (str(ObjectId()) for _ in range(3))
+START = datetime(2024, 1, 1)
+
+
+def _expense(day: int, amount: float = 10.0, paid_by: str = ANN) -> dict:
+    other = BEN if paid_by == ANN else ANN
+    return {"groupId": GID, "paidBy": paid_by, "amount": amount, "description": f"day {day}", "type": "expense",
+            "date": START + timedelta(days=day),
+            "splits": [{"userId": paid_by, "amount": amount / 2}, {"userId": other, "amount": amount / 2}]}
+
+
+def _day(day: int) -> datetime:
+    return START + timedelta(days=day, hours=12)
+
+
+async def _point_in_time():
+    await create_expenses([_expense(d, amount=10.0 + d, paid_by=ANN if d % 3 else BEN) for d in range(10)])
+    # expected balances without any checkpoint: a full replay
+    expected = {d: await checkpoint.balances_at(GID, _day(d)) for d in range(10)}
+    first = await checkpoint.create_checkpoint(GID, as_of=_day(3))
+    assert first["expenseCount"] == 4
+    assert await checkpoint.create_checkpoint(GID, as_of=_day(3)) is None
+    await checkpoint.create_checkpoint(GID, as_of=_day(7))
+    assert await checkpoint.verify(GID) == []
+    return expected, {d: await checkpoint.balances_at(GID, _day(d)) for d in range(10)}
+
+
+def test_balances_from_checkpoints_match_a_full_replay():
+    expected, actual = asyncio.run(_point_in_time())
+    assert actual == expected
+    assert expected[9] and expected[0] == {BEN: 500, ANN: -500}
+
+
+async def _backdated_import():
+    await create_expenses([_expense(d) for d in range(6)])
+    for day in (1, 3, 5):
+        await checkpoint.create_checkpoint(GID, as_of=_day(day))
+    await record_expenses([_expense(2, amount=40.0, paid_by=BEN)])
+    remaining = sorted([cp["asOf"] async for cp in checkpoints.find({"groupId": GID})])
+    return remaining, await checkpoint.verify(GID)
+
+
+def test_backdated_import_drops_the_checkpoints_it_invalidates():
+    remaining, problems = asyncio.run(_backdated_import())
+    assert remaining == [_day(1)]
+    assert problems == []
+
+
+async def _no_new_expenses():
+    await create_expenses([_expense(0)])
+    await checkpoint.create_checkpoint(GID, as_of=_day(0))
+    return await checkpoint.create_checkpoint(GID, as_of=_day(5))
+
+
+def test_no_checkpoint_without_new_expenses():
+    assert asyncio.run(_no_new_expenses()) is None
+
+
+async def _compact():
+    await create_expenses([_expense(d) for d in range(0, 120, 3)])
+    for day in range(0, 120, 10):
+        await checkpoint.create_checkpoint(GID, as_of=_day(day))
+    deleted = await checkpoint.compact(GID, now=_day(120))
+    kept = sorted([cp["asOf"] async for cp in checkpoints.find({"groupId": GID})])
+    return deleted, kept, await checkpoint.verify(GID)
+
+
+def test_compaction_keeps_recent_and_one_per_month():
+    deleted, kept, problems = asyncio.run(_compact())
+    cutoff = _day(120) - timedelta(days=checkpoint.CHECKPOINT_KEEP_DAYS)
+    old = [cp for cp in kept if cp < cutoff]
+    assert len({(cp.year, cp.month) for cp in old}) == len(old)
+    assert [cp for cp in kept if cp >= cutoff] == [_day(d) for d in range(0, 120, 10) if _day(d) >= cutoff]
+    assert deleted == 12 - len(kept)
+    assert problems == []
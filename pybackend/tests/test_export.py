@@ -0,0 +1,35 @@
+"""Gzipped exports are .gz files, not a transfer encoding clients would undo."""
+import asyncio
+import gzip
+import json
+
+from support import client, create_group, register, sign_in
+
+
+async def _export(**params):
+    async with client() as api:
+        ids = await register(api, "ann", "ben")
+        await sign_in(api, "ann")
+        gid = await create_group(api, "ben")
+        r = await api.post("/api/expenses", json={
+            "groupId": gid, "paidBy": ids["ann"], "amount": 20, "description": "Dinner",
+            "splits": [{"userId": ids["ann"], "amount": 10}, {"userId": ids["ben"], "amount": 10}]})
+        assert r.status_code == 200, r.text
+        return await api.get(f"/api/expenses/group/{gid}/export", params=params)
+
+
+def test_gzip_export_is_a_gz_file():
+    r = asyncio.run(_export(format="ndjson", gzip="true"))
+    assert r.status_code == 200
+    assert "content-encoding" not in r.headers
+    assert r.headers["content-type"] == "application/gzip"
+    assert r.headers["content-disposition"].endswith('.ndjson.gz"')
+    [line] = gzip.decompress(r.content).decode().splitlines()
+    assert json.loads(line)["description"] == "Dinner"
+
+
+def test_plain_export_keeps_its_media_type():
+    r = asyncio.run(_export(format="csv"))
+    assert r.headers["content-type"].startswith("text/csv")
+    assert r.headers["content-disposition"].endswith('.csv"')
+    assert r.text.splitlines()[1].split(",")[4] == "Dinner"
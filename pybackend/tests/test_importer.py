@@ -0,0 +1,82 @@
+"""Streaming bulk import: line splitting, row errors, batching and the ledger."""
+import asyncio
+import json
+
+import pytest
+from bson import ObjectId
+
+from app.db.connection import expenses
+from app.models.ledger import get_balances, verify_group
+from app.services.importer import RowError, import_expenses, iter_lines, parse_splits
+
+GID, ANN, BEN = (str(ObjectId()) for _ in range(3))
+
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+async def _lines(*parts: bytes):
+    return [item async for item in iter_lines(_chunks(*parts))]
+
+
+def test_lines_are_split_across_chunk_boundaries():
+    lines = asyncio.run(_lines(b"one\r\ntw", b"o\n\nthr", b"ee"))
+    assert lines == [(1, "one"), (2, "two"), (3, ""), (4, "three")]
+
+
+def test_parse_splits():
+    assert parse_splits(f"{ANN}:1.5; {BEN}:2;") == [{"userId": ANN, "amount": "1.5"}, {"userId": BEN, "amount": "2"}]
+    with pytest.raises(RowError):
+        parse_splits("no-amount")
+
+
+def _row(amount=10, **extra):
+    return {"groupId": GID, "paidBy": ANN, "amount": amount, "description": "Taxi",
+            "splits": [{"userId": ANN, "amount": amount / 2}, {"userId": BEN, "amount": amount / 2}], **extra}
+
+
+async def _import(body: bytes, fmt: str, batch_size: int = 500):
+    return await import_expenses(_chunks(body[:7], body[7:]), fmt, batch_size=batch_size)
+
+
+def test_ndjson_rows_are_imported_and_bad_rows_reported_by_line():
+    lines = [json.dumps(_row()), "{not json", json.dumps({**_row(), "splits": []}), json.dumps(_row(amount=4))]
+    body = ("\n".join(lines) + "\n").encode()
+
+    async def run():
+        result = await _import(body, "ndjson", batch_size=1)
+        return result, await expenses.count_documents({}), await get_balances(GID), await verify_group(GID)
+    result, stored, balances, mismatches = asyncio.run(run())
+    assert result["inserted"] == 2 and result["failed"] == 2
+    assert [e["row"] for e in result["errors"]] == [2, 3]
+    assert stored == 2
+    assert balances == {ANN: 700, BEN: -700}
+    assert mismatches == {}
+
+
+def test_csv_rows_are_imported():
+    body = (
+        "groupId,paidBy,amount,description,splits,date\n"
+        f"{GID},{BEN},9,Lunch,{ANN}:4.5;{BEN}:4.5,2024-05-01T12:00:00+02:00\n"
+        f"{GID},{BEN},abc,Bad,{ANN}:1,\n"
+    ).encode()
+
+    async def run():
+        result = await _import(body, "csv")
+        return result, await expenses.find_one({})
+    result, stored = asyncio.run(run())
+    assert result["inserted"] == 1 and [e["row"] for e in result["errors"]] == [3]
+    # dates are stored as naive UTC
+    assert stored["date"].isoformat() == "2024-05-01T10:00:00"
+
+
+def test_overlong_line_stops_the_import_but_keeps_earlier_rows():
+    body = (json.dumps(_row()) + "\n").encode() + b"x" * (65 * 1024)
+
+    async def run():
+        return await import_expenses(_chunks(body[:100], body[100:]), "ndjson", batch_size=500)
+    result = asyncio.run(run())
+    assert result["inserted"] == 1
+    assert result["errors"][0]["row"] == 0
@@ -0,0 +1,47 @@
+"""Ledger deltas and the incrementally maintained balances."""
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.models.expense import create_expense, to_storage
+from app.models.ledger import apply_expense, expense_deltas, get_balances, rebuild_group, verify_group
+
+GID, ANN, BEN, CAT = (str(ObjectId()) for _ in range(4))
+
+
+def _expense(amount=90.0, paid_by=ANN, members=(ANN, BEN, CAT)):
+    share = amount / len(members)
+    return {"groupId": GID, "paidBy": paid_by, "amount": amount, "description": "Dinner", "type": "expense",
+            "date": datetime(2024, 5, 1), "splits": [{"userId": uid, "amount": share} for uid in members]}
+
+
+def test_payer_is_credited_only_the_other_shares():
+    assert dict(expense_deltas(_expense())) == {ANN: 6000, BEN: -3000, CAT: -3000}
+
+
+def test_deltas_of_an_expense_sum_to_zero():
+    deltas = expense_deltas(_expense(amount=100.0))
+    assert sum(deltas.values()) == 0
+
+
+def test_payer_not_in_the_splits_is_credited_everything():
+    assert dict(expense_deltas(_expense(amount=20.0, members=(BEN, CAT)))) == {ANN: 2000, BEN: -1000, CAT: -1000}
+
+
+def test_both_storage_shapes_give_the_same_deltas():
+    legacy = _expense()
+    assert expense_deltas(to_storage(legacy)) == expense_deltas(legacy)
+
+
+async def _record_and_verify():
+    for doc in (_expense(), _expense(amount=30.0, paid_by=BEN, members=(ANN, BEN))):
+        await create_expense(doc)
+        await apply_expense(doc)
+    assert await get_balances(GID) == {ANN: 4500, BEN: -1500, CAT: -3000}
+    assert await verify_group(GID) == {}
+    assert await rebuild_group(GID) == await get_balances(GID)
+
+
+def test_ledger_matches_a_full_replay():
+    asyncio.run(_record_and_verify())
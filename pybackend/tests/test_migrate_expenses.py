@@ -0,0 +1,59 @@
+"""The v2 migration never overwrites a write that lands between its read and its replace."""
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.db.connection import expenses
+from app.models.expense import STORAGE_VERSION, add_missing_terms, set_user_name
+from app.scripts.migrate_expenses import _migrate_batch
+
+GID, PAYER, OTHER = (str(ObjectId()) for _ in range(3))
+
+
+async def _legacy():
+    doc = {"groupId": GID, "paidBy": PAYER, "paidByName": "Ann", "amount": 10.0, "description": "Dinner out",
+           "type": "expense", "date": datetime(2024, 5, 1),
+           "splits": [{"userId": PAYER, "userName": "Ann", "amount": 5.0},
+                      {"userId": OTHER, "userName": "Ben", "amount": 5.0}]}
+    await expenses.insert_one(doc)
+    return await expenses.find_one({"_id": doc["_id"]})
+
+
+async def _rename_during_migration():
+    read = await _legacy()
+    await set_user_name(GID, PAYER, "Annie")
+    assert await _migrate_batch([read], dry_run=False) == (1, 0, 0)
+    stored = await expenses.find_one({"_id": read["_id"]})
+    assert stored["v"] == STORAGE_VERSION
+    assert stored["paidByName"] == "Annie"
+    assert [s.get("n") for s in stored["splits"]] == ["Annie", "Ben"]
+
+
+async def _terms_during_migration():
+    read = await _legacy()
+    await expenses.update_one({"_id": read["_id"]}, {"$unset": {"terms": ""}})
+    read = await expenses.find_one({"_id": read["_id"]})
+    await add_missing_terms(GID)
+    assert await _migrate_batch([read], dry_run=False) == (1, 0, 0)
+    stored = await expenses.find_one({"_id": read["_id"]})
+    assert stored["v"] == STORAGE_VERSION
+    assert stored["terms"] == ["dinner", "out"]
+
+
+async def _unchanged():
+    read = await _legacy()
+    assert await _migrate_batch([read], dry_run=False) == (1, 0, 0)
+    assert (await expenses.find_one({"_id": read["_id"]}))["cents"] == 1000
+
+
+def test_rename_between_read_and_replace_is_kept():
+    asyncio.run(_rename_during_migration())
+
+
+def test_terms_added_between_read_and_replace_are_kept():
+    asyncio.run(_terms_during_migration())
+
+
+def test_unchanged_document_is_converted():
+    asyncio.run(_unchanged())
@@ -0,0 +1,28 @@
+"""Renames retire cached group responses."""
+import asyncio
+
+from support import client, create_group, register, sign_in
+
+
+async def _rename_member_without_expenses():
+    async with client() as api:
+        await register(api, "ann", "ben")
+        await sign_in(api, "ann")
+        gid = await create_group(api, "ben")
+
+        before = await api.get(f"/api/groups/{gid}")
+        etag = before.headers["etag"]
+        assert (await api.get(f"/api/groups/{gid}", headers={"If-None-Match": etag})).status_code == 304
+
+        # Ann has no expenses in the group; only its member list carries her name
+        r = await api.patch("/api/auth/me", json={"name": "Annie"})
+        assert r.status_code == 200, r.text
+
+        after = await api.get(f"/api/groups/{gid}", headers={"If-None-Match": etag})
+        assert after.status_code == 200
+        assert after.headers["etag"] != etag
+        assert "Annie" in after.text
+
+
+def test_rename_without_expenses_changes_group_etag():
+    asyncio.run(_rename_member_without_expenses())
@@ -0,0 +1,84 @@
+"""Keyset pagination over (date, _id), newest first."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.models.activity import fan_out, list_for_user
+from app.models.expense import create_expenses, list_by_group
+from app.utils.pagination import decode_cursor, encode_cursor, split_page
+from support import client, create_group, register, sign_in
+
+GID, ANN = str(ObjectId()), str(ObjectId())
+DAY = datetime(2024, 5, 1)
+
+
+def test_cursor_round_trip():
+    oid = ObjectId()
+    assert decode_cursor(encode_cursor(DAY, oid)) == (DAY, oid)
+
+
+@pytest.mark.parametrize("cursor", ["", "zzz", "eyJkIjoxfQ", encode_cursor(DAY, ObjectId())[:-4]])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_split_page_only_returns_a_cursor_when_more_follow():
+    docs = [{"date": DAY, "_id": ObjectId()} for _ in range(3)]
+    assert split_page(docs, 3) == (docs, None)
+    page, cursor = split_page(docs, 2)
+    assert page == docs[:2] and decode_cursor(cursor) == (DAY, docs[1]["_id"])
+
+
+async def _walk_expenses():
+    # three expenses share a date: the _id tie-break must neither skip nor repeat them
+    dates = [DAY, DAY, DAY, DAY - timedelta(days=1), DAY + timedelta(days=1)]
+    docs = [{"groupId": GID, "paidBy": ANN, "amount": 1.0, "description": f"e{i}", "type": "expense",
+             "date": date, "splits": [{"userId": ANN, "amount": 1.0}]} for i, date in enumerate(dates)]
+    await create_expenses(docs)
+    expected = [str(d["_id"]) for d in sorted(docs, key=lambda d: (d["date"], d["_id"]), reverse=True)]
+    seen, cursor = [], None
+    while True:
+        items, cursor = await list_by_group(GID, limit=2, before=cursor)
+        seen += [it.id for it in items]
+        if cursor is None:
+            return seen, expected
+
+
+def test_expense_pages_visit_every_expense_once_in_order():
+    seen, expected = asyncio.run(_walk_expenses())
+    assert seen == expected
+
+
+async def _walk_activity():
+    expenses = [{"_id": ObjectId(), "groupId": GID, "type": "expense", "amount": 1.0,
+                 "date": DAY + timedelta(hours=i % 2)} for i in range(5)]
+    await fan_out(expenses, [ANN])
+    seen, cursor = [], None
+    while True:
+        page, cursor = await list_for_user(ANN, limit=2, before=cursor)
+        seen += [doc["expenseId"] for doc in page]
+        if cursor is None:
+            return sorted(seen) == sorted(e["_id"] for e in expenses) and len(seen) == len(set(seen))
+
+
+def test_activity_pages_visit_every_entry_once():
+    assert asyncio.run(_walk_activity())
+
+
+async def _api_pages():
+    async with client() as api:
+        await register(api, "ann", "ben")
+        await sign_in(api, "ann")
+        gid = await create_group(api, "ben")
+        bad = await api.get(f"/api/expenses/group/{gid}", params={"before": "zzz"})
+        empty = await api.get(f"/api/expenses/group/{gid}", params={"limit": 1})
+        return bad.status_code, empty.json()
+
+
+def test_listing_rejects_malformed_cursor_and_ends_with_null():
+    status, body = asyncio.run(_api_pages())
+    assert status == 400
+    assert body == {"items": [], "nextCursor": None}
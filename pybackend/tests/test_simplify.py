@@ -0,0 +1,72 @@
+"""Debt simplification: both solvers settle every balance, exact never needs more transfers."""
+import random
+
+from app.services import simplify as simplify_module
+from app.services.simplify import debts_cache, simplify, simplify_exact, simplify_greedy, simplify_group
+
+
+def _settle(balances, transfers):
+    after = dict(balances)
+    for debtor, creditor, cents in transfers:
+        assert cents > 0
+        after[debtor] += cents
+        after[creditor] -= cents
+    return after
+
+
+def _random_balances(rng, members):
+    amounts = [rng.randint(-5000, 5000) for _ in range(members - 1)]
+    amounts.append(-sum(amounts))
+    return {f"u{i}": amt for i, amt in enumerate(amounts)}
+
+
+def test_both_solvers_settle_every_balance():
+    rng = random.Random(7)
+    for _ in range(50):
+        balances = _random_balances(rng, rng.randint(2, 10))
+        for solver in (simplify_greedy, simplify_exact):
+            assert not any(_settle(balances, solver(balances)).values())
+
+
+def test_settled_group_needs_no_transfers():
+    balances = {"a": 0, "b": 0, "c": 0}
+    assert simplify_greedy(balances) == []
+    assert simplify_exact(balances) == []
+    assert simplify({}) == []
+
+
+def test_exact_never_needs_more_transfers_than_greedy():
+    rng = random.Random(11)
+    for _ in range(50):
+        balances = _random_balances(rng, rng.randint(2, 10))
+        assert len(simplify_exact(balances)) <= len(simplify_greedy(balances))
+
+
+def test_exact_uses_disjoint_zero_sum_groups():
+    # seven balances forming three zero-sum groups ({a, b}, {c, d}, {e, f, g}) need 7 - 3 transfers
+    balances = {"a": 500, "b": -500, "c": 400, "d": -400, "e": 300, "f": -100, "g": -200}
+    assert len(simplify_exact(balances)) == 4
+    assert len(simplify_exact({"a": 10, "b": -10, "c": 5, "d": -5})) == 2
+
+
+def test_auto_falls_back_to_greedy_above_exact_max(monkeypatch):
+    calls = []
+    monkeypatch.setattr(simplify_module, "simplify_exact", lambda b: calls.append("exact") or [])
+    balances = _random_balances(random.Random(3), 5)
+    simplify(balances, exact_max=4)
+    assert calls == []
+    simplify(balances, exact_max=5)
+    assert calls == ["exact"]
+    assert simplify(balances, mode="greedy", exact_max=100) == simplify_greedy(balances)
+
+
+def test_group_result_is_solved_once_per_version(monkeypatch):
+    debts_cache.clear()
+    solved = []
+    monkeypatch.setattr(simplify_module, "simplify", lambda b: solved.append(b) or simplify_greedy(b))
+    balances = {"a": 300, "b": -300}
+    assert simplify_group("g", 4, balances) == simplify_group("g", 4, balances) == [("b", "a", 300)]
+    assert len(solved) == 1
+    simplify_group("g", 5, balances)
+    simplify_group("g", None, balances)
+    assert len(solved) == 3
@@ -1,11 +1,11 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from "@/components/ui/dialog";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Label } from "@/components/ui/label";
 import { Checkbox } from "@/components/ui/checkbox";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
-import { User } from "@/lib/api";
+import { User, expensesApi } from "@/lib/api";
 import { Receipt, DollarSign } from "lucide-react";
 import { toast } from "@/hooks/use-toast";
 
@@ -13,16 +13,30 @@ interface AddExpenseModalProps {
   open: boolean;
   onOpenChange: (open: boolean) => void;
   members: User[];
+  groupId?: string;
   onAdd: (expense: { description: string; amount: number; paidBy: string; splitBetween: string[] }) => void;
 }
 
-export const AddExpenseModal = ({ open, onOpenChange, members = [], onAdd }: AddExpenseModalProps) => {
+export const AddExpenseModal = ({ open, onOpenChange, members = [], groupId, onAdd }: AddExpenseModalProps) => {
   const [description, setDescription] = useState("");
+  const [suggestions, setSuggestions] = useState<string[]>([]);
   const [amount, setAmount] = useState("");
   const [paidBy, setPaidBy] = useState("");
   const [splitBetween, setSplitBetween] = useState<string[]>([]);
   const [isSubmitting, setIsSubmitting] = useState(false);
 
+  // Autocomplete from the group's past descriptions, debounced while typing
+  useEffect(() => {
+    if (!open || !groupId) return;
+    const timer = setTimeout(() => {
+      expensesApi
+        .suggest(groupId, description)
+        .then((rows) => setSuggestions(rows.map((row) => row.description)))
+        .catch(() => setSuggestions([]));
+    }, 150);
+    return () => clearTimeout(timer);
+  }, [open, groupId, description]);
+
   const getMemberName = (member: User) => {
     if (!member) return "Unknown Member";
     const m = member as any;
@@ -97,7 +111,14 @@ export const AddExpenseModal = ({ open, onOpenChange, members = [], onAdd }: Add
               placeholder="What was this expense for?"
               value={description}
               onChange={(e) => setDescription(e.target.value)}
+              list="description-suggestions"
+              autoComplete="off"
             />
+            <datalist id="description-suggestions">
+              {suggestions.map((text) => (
+                <option key={text} value={text} />
+              ))}
+            </datalist>
           </div>
 
           <div className="space-y-2">
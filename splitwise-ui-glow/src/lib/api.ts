@@ -17,6 +17,7 @@ export interface Group {
   balances?: Balance[];
   debts?: Debt[];
   createdAt?: string;
+  version?: number;
 }
 
 export interface Debt {
@@ -43,6 +44,11 @@ export interface Expense {
   createdAt: string;
 }
 
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+}
+
 export interface Balance {
   userId: string;
   amount: number;
@@ -79,6 +85,14 @@ async function apiRequest<T>(
   return response.json();
 }
 
+// Pushed on /api/groups/{id}/events after every expense or settlement
+export interface GroupEvent {
+  version: number | null;
+  expense?: Omit<Expense, "paidByName" | "splits"> & { splits: { userId: string; amount: number }[] };
+  balances?: Balance[];
+  debts?: Debt[];
+}
+
 // Groups API
 export const groupsApi = {
   getAll: async () => {
@@ -107,18 +121,35 @@ export const groupsApi = {
       method: "POST",
       body: JSON.stringify(data),
     }),
+
+  // Server-Sent Events: "hello", "expense", "settlement" and "resync", each carrying a GroupEvent
+  subscribe: (groupId: string) =>
+    new EventSource(`${API_URL}/api/groups/${groupId}/events`, { withCredentials: true }),
 };
 
 // Expenses API
 export const expensesApi = {
-  getByGroupId: async (groupId: string) => {
-    const expenses = await apiRequest<Expense[]>(`/api/expenses/group/${groupId}`);
-    return expenses.map((e) => ({
-      ...e,
-      id: e.id || e._id || "",
-      amount: Number(e.amount ?? 0),
-      splits: (e.splits || []).map((s) => ({ ...s, amount: Number(s.amount ?? 0) })),
-    }));
+  getPage: async (groupId: string, before?: string) => {
+    const query = before ? `?before=${encodeURIComponent(before)}` : "";
+    const page = await apiRequest<Page<Expense>>(`/api/expenses/group/${groupId}${query}`);
+    return {
+      nextCursor: page.nextCursor,
+      items: page.items.map((e) => ({
+        ...e,
+        id: e.id || e._id || "",
+        amount: Number(e.amount ?? 0),
+        splits: (e.splits || []).map((s) => ({ ...s, amount: Number(s.amount ?? 0) })),
+      })),
+    };
+  },
+
+  // First (most recent) page only; use getPage with nextCursor to load older expenses
+  getByGroupId: async (groupId: string) => (await expensesApi.getPage(groupId)).items,
+
+  // The group's most used descriptions starting with `prefix`, most frequent first
+  suggest: async (groupId: string, prefix: string) => {
+    const query = `?prefix=${encodeURIComponent(prefix)}`;
+    return apiRequest<{ description: string; count: number }[]>(`/api/expenses/group/${groupId}/suggest${query}`);
   },
   
   create: async (data: {
@@ -160,6 +191,14 @@ export const settlementsApi = {
     }),
 };
 
+// Dashboard API: net position with each counterparty across all groups
+export const dashboardApi = {
+  get: async () => {
+    const data = await apiRequest<{ balances: { user: User; amount: number }[] }>("/api/dashboard");
+    return data.balances.map((b) => ({ ...b, amount: Number(b.amount ?? 0) }));
+  },
+};
+
 // User API (using auth endpoint for current user)
 export const userApi = {
   getMe: () => apiRequest<User>("/api/auth/me"),
@@ -167,5 +206,9 @@ export const userApi = {
 
 // Activity API
 export const activityApi = {
-  getRecent: () => apiRequest<any[]>("/api/activity"),
+  getRecent: async (before?: string) => {
+    const query = before ? `?before=${encodeURIComponent(before)}` : "";
+    const page = await apiRequest<Page<any>>(`/api/activity${query}`);
+    return page.items;
+  },
 };
@@ -6,7 +6,7 @@ import { ActivityFeed } from "@/components/ActivityFeed";
 import { CreateGroupModal } from "@/components/CreateGroupModal";
 import { Button } from "@/components/ui/button";
 import { Plus, Users, TrendingUp, Loader2 } from "lucide-react";
-import { groupsApi, Group, Debt } from "@/lib/api";
+import { groupsApi, dashboardApi, Group } from "@/lib/api";
 import { toast } from "@/hooks/use-toast";
 import { Balance } from "@/types/balance";
 import { useAuth } from "@/contexts/AuthContexts";
@@ -24,43 +24,14 @@ const Dashboard = () => {
     try {
       setLoading(true);
       
-      const initialGroups = await groupsApi.getAll();
-      
-      const detailedGroups = await Promise.all(
-        initialGroups.map(group => groupsApi.getById(group.id))
-      );
-
-      const allDebts: (Debt & { group: Group })[] = detailedGroups.flatMap(group => 
-        (group.debts || []).map(debt => ({ ...debt, group }))
-      );
-      
-      const userBalances: { [key: string]: { user: any, amount: number } } = {};
+      // Two requests however many groups: the server nets debts per counterparty
+      const [initialGroups, counterpartyBalances] = await Promise.all([
+        groupsApi.getAll(),
+        dashboardApi.get(),
+      ]);
 
-      for (const debt of allDebts) {
-        const groupForDebt = detailedGroups.find(g => g.id === debt.group.id);
-        if (!groupForDebt) continue;
-
-        if (debt.from === user.id) { // Current user owes money
-          const otherUser = groupForDebt.members.find(m => m.id === debt.to);
-          if (otherUser) {
-            if (!userBalances[otherUser.id]) {
-              userBalances[otherUser.id] = { user: otherUser, amount: 0 };
-            }
-            userBalances[otherUser.id].amount -= debt.amount;
-          }
-        } else if (debt.to === user.id) { // Money is owed to the current user
-          const otherUser = groupForDebt.members.find(m => m.id === debt.from);
-          if (otherUser) {
-            if (!userBalances[otherUser.id]) {
-              userBalances[otherUser.id] = { user: otherUser, amount: 0 };
-            }
-            userBalances[otherUser.id].amount += debt.amount;
-          }
-        }
-      }
-      
       setGroups(initialGroups);
-      setBalances(Object.values(userBalances).filter(b => b.amount !== 0));
+      setBalances(counterpartyBalances);
 
     } catch (error) {
       toast({
@@ -1,4 +1,4 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { useParams, Link } from "react-router-dom";
 import { Navbar } from "@/components/Navbar";
 import { ExpenseCard } from "@/components/ExpenseCard";
@@ -7,7 +7,7 @@ import { SettleUpModal } from "@/components/SettleUpModal";
 import { UserAvatar } from "@/components/UserAvatar";
 import { Button } from "@/components/ui/button";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
-import { groupsApi, expensesApi, settlementsApi, Group, Expense, Balance, Debt } from "@/lib/api";
+import { groupsApi, expensesApi, settlementsApi, Group, GroupEvent, Expense, Balance, Debt } from "@/lib/api";
 import { useAuth } from "@/contexts/AuthContexts";
 import { toast } from "@/hooks/use-toast";
 import {
@@ -30,20 +30,30 @@ const GroupDetails = () => {
   const [balances, setBalances] = useState<Balance[]>([]);
   const [debts, setDebts] = useState<Debt[]>([]);
   const [loading, setLoading] = useState(true);
+  // Cursor of the next (older) page of expenses; null once the oldest is loaded
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const [showAddExpense, setShowAddExpense] = useState(false);
   const [showSettleUp, setShowSettleUp] = useState(false);
+  // Group version the rendered data reflects; pushed events must follow it without gaps
+  const versionRef = useRef<number | null>(null);
+  const membersRef = useRef<Group["members"]>([]);
+  const eventsRef = useRef<EventSource | null>(null);
 
-  const fetchGroupData = async () => {
+  const fetchGroupData = async (silent = false) => {
     if (!id) return;
     
     try {
-      setLoading(true);
-      const [groupData, expensesData] = await Promise.all([
+      if (!silent) setLoading(true);
+      const [groupData, expensesPage] = await Promise.all([
         groupsApi.getById(id),
-        expensesApi.getByGroupId(id),
+        expensesApi.getPage(id),
       ]);
+      versionRef.current = groupData.version ?? null;
+      membersRef.current = groupData.members;
       setGroup(groupData);
-      setExpenses(expensesData);
+      setExpenses(expensesPage.items);
+      setNextCursor(expensesPage.nextCursor);
       setBalances(groupData.balances || []);
       setDebts(groupData.debts || []);
     } catch (error) {
@@ -57,10 +67,86 @@ const GroupDetails = () => {
     }
   };
 
+  const loadOlder = async () => {
+    if (!id || !nextCursor) return;
+    try {
+      setLoadingOlder(true);
+      const page = await expensesApi.getPage(id, nextCursor);
+      setExpenses((prev) => {
+        const seen = new Set(prev.map((e) => e.id));
+        return [...prev, ...page.items.filter((e) => !seen.has(e.id))];
+      });
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      toast({
+        title: "Error",
+        description: "Failed to load older expenses",
+        variant: "destructive",
+      });
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
+
   useEffect(() => {
     fetchGroupData();
   }, [id]);
 
+  // Live updates: apply pushed expenses and balances instead of re-fetching
+  useEffect(() => {
+    if (!id) return;
+    const source = groupsApi.subscribe(id);
+    eventsRef.current = source;
+
+    const nameOf = (userId: string) =>
+      membersRef.current.find((m) => m.id === userId)?.name || "Unknown";
+
+    const applyChange = (message: MessageEvent) => {
+      const event: GroupEvent = JSON.parse(message.data);
+      const current = versionRef.current;
+      if (event.version === null || current === null) {
+        fetchGroupData(true);
+        return;
+      }
+      if (event.version <= current) return; // already reflected
+      if (event.version !== current + 1 || !event.expense) {
+        // missed an update (or a batch import): load the group again
+        fetchGroupData(true);
+        return;
+      }
+      versionRef.current = event.version;
+      const pushed = event.expense;
+      const expense: Expense = {
+        ...pushed,
+        paidByName: nameOf(pushed.paidBy),
+        splits: pushed.splits.map((s) => ({ ...s, userName: nameOf(s.userId) })),
+      };
+      setExpenses((prev) => [expense, ...prev.filter((e) => e.id !== expense.id)]);
+      if (event.balances) setBalances(event.balances);
+      if (event.debts) setDebts(event.debts);
+    };
+
+    source.addEventListener("hello", (message) => {
+      const event: GroupEvent = JSON.parse((message as MessageEvent).data);
+      if (versionRef.current !== null && event.version !== versionRef.current) fetchGroupData(true);
+    });
+    source.addEventListener("expense", (message) => applyChange(message as MessageEvent));
+    source.addEventListener("settlement", (message) => applyChange(message as MessageEvent));
+    source.addEventListener("resync", () => fetchGroupData(true));
+
+    return () => {
+      source.close();
+      eventsRef.current = null;
+    };
+  }, [id]);
+
+  // Own writes arrive through the event stream; re-fetch only if it is not connected
+  const refreshUnlessLive = async () => {
+    if (eventsRef.current?.readyState !== EventSource.OPEN) {
+      await fetchGroupData(true);
+    }
+  };
+
   if (loading) {
     return (
       <div className="min-h-screen bg-background">
@@ -110,8 +196,7 @@ const GroupDetails = () => {
       });
 
       setShowAddExpense(false);
-      // Refresh all data to update expenses, balances, and group totals
-      await fetchGroupData();
+      await refreshUnlessLive();
 
       toast({
         title: "Expense added!",
@@ -135,8 +220,7 @@ const GroupDetails = () => {
         amount,
       });
 
-      // Refresh all data to update balances
-      await fetchGroupData();
+      await refreshUnlessLive();
 
       toast({
         title: "Settlement recorded!",
@@ -252,6 +336,12 @@ const GroupDetails = () => {
                 </Button>
               </div>
             )}
+            {nextCursor && (
+              <Button variant="outline" className="w-full" onClick={loadOlder} disabled={loadingOlder}>
+                {loadingOlder ? <Loader2 className="h-4 w-4 mr-2 animate-spin" /> : <Clock className="h-4 w-4 mr-2" />}
+                Load older
+              </Button>
+            )}
           </TabsContent>
 
           {/* Balances Tab */}
@@ -335,6 +425,12 @@ const GroupDetails = () => {
               ) : (
                 <p className="text-center text-muted-foreground py-4">No activity yet</p>
               )}
+              {nextCursor && (
+                <Button variant="outline" className="w-full mt-4" onClick={loadOlder} disabled={loadingOlder}>
+                  {loadingOlder ? <Loader2 className="h-4 w-4 mr-2 animate-spin" /> : <Clock className="h-4 w-4 mr-2" />}
+                  Load older
+                </Button>
+              )}
             </div>
           </TabsContent>
         </Tabs>
@@ -344,6 +440,7 @@ const GroupDetails = () => {
         open={showAddExpense}
         onOpenChange={setShowAddExpense}
         members={group.members}
+        groupId={group.id}
         onAdd={handleAddExpense}
       />
 